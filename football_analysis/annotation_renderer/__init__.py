@@ -0,0 +1 @@
+from .annotation_renderer import AnnotationRenderer, TracksLayer, BallControlLayer, CameraMovementLayer, SpeedAndDistanceLayer, PlayerStatsLayer, HIGHLIGHT_COLORS
\ No newline at end of file
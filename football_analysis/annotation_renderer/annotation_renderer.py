@@ -0,0 +1,157 @@
+import cv2
+import sys 
+sys.path.append('../')
+from utils import draw_transparent_rectangle
+
+HIGHLIGHT_COLORS = [
+    (0, 255, 255),    # Cyan
+    (255, 0, 255),    # Magenta
+    (0, 255, 0),      # Green
+    (255, 165, 0),    # Orange
+    (255, 0, 0),      # Red
+    (128, 0, 128),    # Purple
+    (0, 128, 255),    # Light Blue
+    (255, 255, 0)     # Bright Yellow
+]
+
+class AnnotationRenderer:
+    """Draws every annotation layer of a frame in one pass, into the frame itself.
+
+    The per-frame track dicts are looked up once and handed to every layer, and
+    translucent boxes are blended over their own region only, so rendering
+    needs no full-frame copies. A layer is any object with a
+    draw(frame, frame_data) method; frame_data holds frame_num and the
+    players, referees and ball dicts of the frame.
+    """
+    def __init__(self, tracks, layers=None):
+        self.tracks = tracks
+        self.layers = list(layers or [])
+
+    def add_layer(self, layer):
+        self.layers.append(layer)
+        return self
+
+    def get_frame_data(self, frame_num):
+        return {
+            'frame_num': frame_num,
+            'players': self.tracks['players'][frame_num],
+            'referees': self.tracks['referees'][frame_num],
+            'ball': self.tracks['ball'][frame_num],
+        }
+
+    def render(self, frame, frame_num):
+        # Frames past the tracks (e.g. a trailing frame the tracker never saw) are left as they are
+        if frame_num >= len(self.tracks['players']):
+            return frame
+
+        frame_data = self.get_frame_data(frame_num)
+        for layer in self.layers:
+            frame = layer.draw(frame, frame_data)
+        return frame
+
+    def render_frames(self, frames):
+        for frame_num, frame in enumerate(frames):
+            yield self.render(frame, frame_num)
+
+class TracksLayer:
+    def __init__(self, tracker, highlighted_players=None):
+        self.tracker = tracker
+        self.highlighted_players = highlighted_players
+
+    def draw(self, frame, frame_data):
+        return self.tracker.draw_frame_tracks(frame, frame_data['players'], frame_data['referees'],
+                                              frame_data['ball'], self.highlighted_players)
+
+class BallControlLayer:
+    def __init__(self, tracker, team_ball_control):
+        self.tracker = tracker
+        self.ball_control_percentages = tracker.get_ball_control_percentages(team_ball_control)
+
+    def draw(self, frame, frame_data):
+        return self.tracker.draw_team_ball_control(frame, frame_data['frame_num'], self.ball_control_percentages)
+
+class CameraMovementLayer:
+    def __init__(self, camera_movement_estimator, camera_movement_per_frame):
+        self.camera_movement_estimator = camera_movement_estimator
+        self.camera_movement_per_frame = camera_movement_per_frame
+
+    def draw(self, frame, frame_data):
+        return self.camera_movement_estimator.draw_frame_camera_movement(frame, frame_data['frame_num'],
+                                                                         self.camera_movement_per_frame)
+
+class SpeedAndDistanceLayer:
+    def __init__(self, speed_and_distance_estimator):
+        self.speed_and_distance_estimator = speed_and_distance_estimator
+
+    def draw(self, frame, frame_data):
+        return self.speed_and_distance_estimator.draw_track_speeds(frame, frame_data['players'])
+
+class PlayerStatsLayer:
+    """Statistics box of the chosen players; times count from start_frame of the video"""
+    def __init__(self, chosen_players, total_frames, fps=24, start_frame=0):
+        self.chosen_players = chosen_players
+        self.total_frames = total_frames
+        self.fps = fps
+        self.start_frame = start_frame
+
+    def draw(self, frame, frame_data):
+        frame_num = frame_data['frame_num']
+        frame_players = frame_data['players']
+        chosen_players = self.chosen_players
+
+        # Calculate overlay dimensions based on number of players
+        players_in_frame = []
+        for player_id in chosen_players:
+            if player_id in frame_players:
+                players_in_frame.append(player_id)
+        
+        if players_in_frame:
+            # Dynamic overlay size based on number of players
+            overlay_height = 60 + (len(players_in_frame) * 25)
+            overlay_width = 500
+            
+            # Draw main overlay
+            alpha = 0.8
+            draw_transparent_rectangle(frame, (10, 10), (overlay_width, overlay_height), (0, 0, 0), alpha)
+            
+            # Header
+            cv2.putText(frame, f"🏃 JOGADORES ANALISADOS ({len(players_in_frame)}/{len(chosen_players)})", 
+                       (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            
+            # Individual player stats
+            y_offset = 55
+            for i, player_id in enumerate(players_in_frame):
+                player_data = frame_players[player_id]
+                color = HIGHLIGHT_COLORS[chosen_players.index(player_id) % len(HIGHLIGHT_COLORS)]
+                
+                # Get current stats
+                current_speed = player_data.get('speed', 0)
+                current_distance = player_data.get('distance', 0)
+                has_ball = player_data.get('has_ball', False)
+                team = player_data.get('team', 'N/A')
+                
+                # Player info line
+                ball_icon = "⚽" if has_ball else "  "
+                speed_icon = "🚀" if current_speed > 20 else "🏃" if current_speed > 10 else "🚶"
+                
+                player_text = f"{ball_icon}J{player_id} T{team}: {current_speed:.1f}km/h {current_distance:.0f}m {speed_icon}"
+                cv2.putText(frame, player_text, 
+                           (25, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                y_offset += 25
+            
+            # Progress and time info
+            time_elapsed = (self.start_frame + frame_num) / self.fps
+            cv2.putText(frame, f"Tempo: {time_elapsed:.1f}s | Frame: {frame_num+1}/{self.total_frames}", 
+                       (20, overlay_height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (150, 150, 150), 1)
+        
+        else:
+            # No players visible - show warning
+            alpha = 0.7
+            draw_transparent_rectangle(frame, (10, 10), (400, 80), (0, 0, 100), alpha)
+            
+            cv2.putText(frame, f"⚠️  NENHUM JOGADOR SELECIONADO DETECTADO", 
+                       (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+            cv2.putText(frame, f"Jogadores: {chosen_players}", 
+                       (20, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+        
+        return frame
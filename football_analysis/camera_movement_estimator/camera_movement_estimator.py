@@ -1,14 +1,38 @@
-import pickle
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import os
 import cv2
 import numpy as np
-import os
 import sys 
 sys.path.append('../')
-from utils import measure_distance,measure_xy_distance
+from utils import iter_video_frames, get_video_properties, get_analysis_scale, downscale_gray, draw_transparent_rectangle
+
+# Feature regions as (x1, y1, x2, y2) fractions of the frame: the left edge and
+# a band right of the centre, where a broadcast framing shows static pitch marks
+DEFAULT_MASK_REGIONS = (
+    (0, 0, 20/1920, 1),
+    (900/1920, 0, 1050/1920, 1),
+)
 
 class CameraMovementEstimator():
-    def __init__(self,frame):
+    """Global camera motion between consecutive frames.
+
+    Features in the masked bands are followed with Lucas-Kanade flow on
+    grayscale frames downscaled to analysis_height, so the cost does not grow
+    with the input resolution. A similarity transform (translation, rotation,
+    zoom) is fitted to all their displacements with RANSAC, so players crossing
+    the bands are rejected as outliers, and the camera movement is the mean
+    displacement the fitted motion gives at the inlier features.
+    """
+    def __init__(self,frame, analysis_height=540, mask_regions=DEFAULT_MASK_REGIONS,
+                 ransac_reproj_threshold=3.0, min_tracked_features=10):
+        # Features are re-detected after a movement larger than this (full-resolution pixels)
         self.minimum_distance = 5
+        self.analysis_height = analysis_height
+        self.downscale = get_analysis_scale(frame.shape[0], analysis_height)
+        self.mask_regions = mask_regions
+        self.ransac_reproj_threshold = ransac_reproj_threshold
+        self.min_tracked_features = min_tracked_features
 
         self.lk_params = dict(
             winSize = (15,15),
@@ -16,10 +40,13 @@ class CameraMovementEstimator():
             criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT,10,0.03)
         )
 
-        first_frame_grayscale = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+        first_frame_grayscale = self.prepare_gray(frame)
         mask_features = np.zeros_like(first_frame_grayscale)
-        mask_features[:,0:20] = 1
-        mask_features[:,900:1050] = 1
+        height, width = mask_features.shape
+        for x1, y1, x2, y2 in mask_regions:
+            column_start, row_start = int(x1 * width), int(y1 * height)
+            mask_features[row_start:max(int(y2 * height), row_start + 1),
+                          column_start:max(int(x2 * width), column_start + 1)] = 1
 
         self.features = dict(
             maxCorners = 100,
@@ -29,6 +56,10 @@ class CameraMovementEstimator():
             mask = mask_features
         )
 
+        # State for frame-by-frame (streaming) estimation
+        self.old_gray = None
+        self.old_features = None
+
     def add_adjust_positions_to_tracks(self,tracks, camera_movement_per_frame):
         for object, object_tracks in tracks.items():
             for frame_num, track in enumerate(object_tracks):
@@ -40,43 +71,140 @@ class CameraMovementEstimator():
                     
 
 
-    def get_camera_movement(self,frames,read_from_stub=False, stub_path=None):
-        # Read the stub 
-        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path,'rb') as f:
-                return pickle.load(f)
-
-        camera_movement = [[0,0]]*len(frames)
-
-        old_gray = cv2.cvtColor(frames[0],cv2.COLOR_BGR2GRAY)
-        old_features = cv2.goodFeaturesToTrack(old_gray,**self.features)
-
-        for frame_num in range(1,len(frames)):
-            frame_gray = cv2.cvtColor(frames[frame_num],cv2.COLOR_BGR2GRAY)
-            new_features, _,_ = cv2.calcOpticalFlowPyrLK(old_gray,frame_gray,old_features,None,**self.lk_params)
-
-            max_distance = 0
-            camera_movement_x, camera_movement_y = 0,0
+    def add_adjust_positions_to_table(self, table, camera_movement_per_frame):
+        camera_movement = np.asarray(camera_movement_per_frame, dtype=np.float32).reshape(-1, 2)
+        table.position_adjusted[:] = table.position - camera_movement[table.frame]
+
+    def get_cache_params(self):
+        """Parameters that change the estimated movement, used to key the cache"""
+        return {
+            'minimum_distance': self.minimum_distance,
+            'downscale': self.downscale,
+            'mask_regions': self.mask_regions,
+            'ransac_reproj_threshold': self.ransac_reproj_threshold,
+            'min_tracked_features': self.min_tracked_features,
+            'lk_params': self.lk_params,
+            'features': {k: v for k, v in self.features.items() if k != 'mask'},
+        }
+
+    def get_camera_movement(self,frames,cache=None, cache_key=None):
+        if cache is not None and cache_key is not None:
+            camera_movement = cache.get(cache_key)
+            if camera_movement is not None:
+                return camera_movement
+
+        # frames can be any iterable, so a video can be streamed from disk
+        self.reset()
+        camera_movement = [self.update(frame) for frame in frames]
+        
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, camera_movement)
 
-            for i, (new,old) in enumerate(zip(new_features,old_features)):
-                new_features_point = new.ravel()
-                old_features_point = old.ravel()
+        return camera_movement
 
-                distance = measure_distance(new_features_point,old_features_point)
-                if distance>max_distance:
-                    max_distance = distance
-                    camera_movement_x,camera_movement_y = measure_xy_distance(old_features_point, new_features_point ) 
-            
-            if max_distance > self.minimum_distance:
-                camera_movement[frame_num] = [camera_movement_x,camera_movement_y]
-                old_features = cv2.goodFeaturesToTrack(frame_gray,**self.features)
+    def get_camera_movement_parallel(self, source, num_workers=None, chunk_size=None, cache=None, cache_key=None,
+                                     start_frame=0, end_frame=None):
+        """get_camera_movement over frame chunks processed concurrently in a thread pool.
+
+        source is a video path (each chunk seeks to its own range) or a
+        sequence of frames; start_frame/end_frame restrict it to a segment.
+        Chunks overlap by one frame so the movement at every chunk boundary is
+        measured too; OpenCV releases the GIL, so the chunks run in parallel.
+
+        The result is not identical to get_camera_movement: each chunk detects
+        fresh features on its first frame instead of carrying over the ones the
+        sequential run was following, and the two runs only agree again once
+        both re-select features on the same frame. The gap grows with how long
+        the sequential run has followed the same features: on synthetic pans
+        without re-selection it reached 0.15 px at 3 px/frame and 1.2 px at
+        4 px/frame (where the fresh features were the closer ones to the true
+        motion).
+        """
+        if cache is not None and cache_key is not None:
+            camera_movement = cache.get(cache_key)
+            if camera_movement is not None:
+                return camera_movement
+
+        from_video = isinstance(source, str)
+        whole_video = end_frame is None
+        if end_frame is None:
+            end_frame = get_video_properties(source)['frame_count'] if from_video else len(source)
+        num_frames = max(end_frame - start_frame, 0)
+        num_workers = num_workers or os.cpu_count() or 1
+        chunk_size = chunk_size or max(1, -(-num_frames // num_workers))
+        starts = list(range(0, max(num_frames, 1), chunk_size))
+
+        def estimate_chunk(chunk_index):
+            start = starts[chunk_index]
+            # The container's frame count can be off, so the last chunk of a whole video reads to the end
+            if chunk_index + 1 < len(starts):
+                end = start_frame + starts[chunk_index + 1]
+            else:
+                end = None if whole_video else end_frame
+            read_start = start_frame + max(start - 1, 0)
+            if from_video:
+                frames = iter_video_frames(source, read_start, end)
+            else:
+                frames = source[read_start:end]
+
+            estimator = copy.copy(self)
+            estimator.reset()
+            camera_movement = [estimator.update(frame) for frame in frames]
+            # The overlapping frame only seeds the chunk
+            return camera_movement if start == 0 else camera_movement[1:]
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            chunks = list(executor.map(estimate_chunk, range(len(starts))))
+        camera_movement = [movement for chunk in chunks for movement in chunk]
+
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, camera_movement)
 
-            old_gray = frame_gray.copy()
-        
-        if stub_path is not None:
-            with open(stub_path,'wb') as f:
-                pickle.dump(camera_movement,f)
+        return camera_movement
 
+    def reset(self):
+        self.old_gray = None
+        self.old_features = None
+
+    def prepare_gray(self, frame):
+        """Grayscale frame at the analysis resolution; can be computed once and shared with other stages"""
+        return downscale_gray(frame, self.downscale)
+
+    def update(self, frame, frame_gray=None):
+        """Return the camera movement of frame relative to the previously seen frame"""
+        if frame_gray is None:
+            frame_gray = self.prepare_gray(frame)
+
+        if self.old_gray is None or self.old_features is None or len(self.old_features) == 0:
+            self.old_gray = frame_gray
+            self.old_features = cv2.goodFeaturesToTrack(frame_gray,**self.features)
+            return [0,0]
+
+        new_features, status, _ = cv2.calcOpticalFlowPyrLK(self.old_gray,frame_gray,self.old_features,None,**self.lk_params)
+        tracked = status.ravel() == 1
+        old_points = self.old_features[tracked].reshape(-1, 2)
+        new_points = new_features[tracked].reshape(-1, 2)
+
+        camera_movement = [0,0]
+        refresh_features = len(old_points) < self.min_tracked_features
+        if len(old_points) >= 3:
+            motion, inliers = cv2.estimateAffinePartial2D(old_points, new_points, method=cv2.RANSAC,
+                                                          ransacReprojThreshold=self.ransac_reproj_threshold)
+            if motion is not None:
+                inliers = inliers.ravel().astype(bool)
+                inlier_points = old_points[inliers]
+                moved_points = inlier_points @ motion[:, :2].T + motion[:, 2]
+                movement = (inlier_points - moved_points).mean(axis=0) / self.downscale
+                camera_movement = [float(movement[0]), float(movement[1])]
+                refresh_features |= np.hypot(*movement) > self.minimum_distance
+                new_points = new_points[inliers]
+
+        if refresh_features:
+            self.old_features = cv2.goodFeaturesToTrack(frame_gray,**self.features)
+        else:
+            self.old_features = new_points.reshape(-1, 1, 2)
+
+        self.old_gray = frame_gray
         return camera_movement
     
     def draw_camera_movement(self,frames, camera_movement_per_frame):
@@ -84,16 +212,17 @@ class CameraMovementEstimator():
 
         for frame_num, frame in enumerate(frames):
             frame= frame.copy()
+            frame = self.draw_frame_camera_movement(frame, frame_num, camera_movement_per_frame)
+            output_frames.append(frame) 
 
-            overlay = frame.copy()
-            cv2.rectangle(overlay,(0,0),(500,100),(255,255,255),-1)
-            alpha =0.6
-            cv2.addWeighted(overlay,alpha,frame,1-alpha,0,frame)
+        return output_frames
 
-            x_movement, y_movement = camera_movement_per_frame[frame_num]
-            frame = cv2.putText(frame,f"Camera Movement X: {x_movement:.2f}",(10,30), cv2.FONT_HERSHEY_SIMPLEX,1,(0,0,0),3)
-            frame = cv2.putText(frame,f"Camera Movement Y: {y_movement:.2f}",(10,60), cv2.FONT_HERSHEY_SIMPLEX,1,(0,0,0),3)
+    def draw_frame_camera_movement(self, frame, frame_num, camera_movement_per_frame):
+        alpha =0.6
+        draw_transparent_rectangle(frame,(0,0),(500,100),(255,255,255),alpha)
 
-            output_frames.append(frame) 
+        x_movement, y_movement = camera_movement_per_frame[frame_num]
+        frame = cv2.putText(frame,f"Camera Movement X: {x_movement:.2f}",(10,30), cv2.FONT_HERSHEY_SIMPLEX,1,(0,0,0),3)
+        frame = cv2.putText(frame,f"Camera Movement Y: {y_movement:.2f}",(10,60), cv2.FONT_HERSHEY_SIMPLEX,1,(0,0,0),3)
 
-        return output_frames
\ No newline at end of file
+        return frame
\ No newline at end of file
@@ -0,0 +1 @@
+from .parallel_downloader import ParallelDownloader, DownloadJob
\ No newline at end of file
@@ -0,0 +1,309 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+class ParallelDownloader:
+    """HTTP downloader for large match videos.
+
+    When the server accepts range requests the file is split into chunks of
+    chunk_size bytes fetched over num_connections concurrent connections and
+    written in place into a preallocated '.part' file with buffered writes. The
+    finished chunks are recorded in a '.part.json' sidecar, so an interrupted
+    download resumes where it stopped (only when the server sends an ETag or
+    Last-Modified to check the file has not changed).
+
+    Downloads are deduplicated: a URL whose size and ETag/Last-Modified match a
+    previous download is not fetched again, and a new file with the same
+    content hash as a known one is replaced by the existing copy. The content
+    hash is kept on the job (DownloadJob.digest) so callers need not hash the
+    file again.
+    """
+    def __init__(self, download_dir='temp_videos', num_connections=4, chunk_size=8 * 1024**2,
+                 buffer_size=1024**2, timeout=60, retries=3):
+        self.download_dir = download_dir
+        self.num_connections = num_connections
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.timeout = timeout
+        self.retries = retries
+
+        os.makedirs(download_dir, exist_ok=True)
+        self.index_path = os.path.join(download_dir, 'downloads.json')
+        self._index_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        # One session per thread keeps its connection alive across chunks
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def probe(self, url):
+        """Final URL, size, content type, validators and range support of a download"""
+        response = self._session().head(url, timeout=self.timeout, allow_redirects=True)
+        response.raise_for_status()
+        headers = response.headers
+        size = int(headers['content-length']) if headers.get('content-length') else None
+        info = {
+            'url': response.url,
+            'size': size,
+            'content_type': headers.get('content-type', '').lower(),
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'accepts_ranges': headers.get('accept-ranges', '').lower() == 'bytes',
+        }
+
+        if size is None or not info['accepts_ranges']:
+            # Some servers only reveal range support (and the size) on a ranged GET
+            with self._session().get(info['url'], headers={'Range': 'bytes=0-0'}, stream=True,
+                                     timeout=self.timeout) as response:
+                content_range = response.headers.get('content-range', '')
+                if response.status_code == 206 and '/' in content_range and not content_range.endswith('*'):
+                    info['size'] = int(content_range.rsplit('/', 1)[1])
+                    info['accepts_ranges'] = True
+        return info
+
+    def start(self, url, dest_path, progress_callback=None):
+        """Start downloading in the background; url may also be the dict returned by probe"""
+        info = url if isinstance(url, dict) else self.probe(url)
+        job = DownloadJob(self, info, dest_path, progress_callback)
+        job.thread.start()
+        return job
+
+    def download(self, url, dest_path, progress_callback=None):
+        """Download and return the path of the file (an existing copy when deduplicated)"""
+        return self.start(url, dest_path, progress_callback).result()
+
+    # Deduplication index
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'files': {}, 'urls': {}}
+
+    def _save_index(self, index):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def find_previous_download(self, info):
+        """(path, digest) of an earlier download of the same URL and version, if it is still on disk"""
+        if not (info.get('etag') or info.get('last_modified')) or info.get('size') is None:
+            return None
+        with self._index_lock:
+            index = self._load_index()
+        known = index['urls'].get(info['url'])
+        if known is None or any(known.get(field) != info.get(field) for field in ('size', 'etag', 'last_modified')):
+            return None
+        path = index['files'].get(known['digest'])
+        if path and os.path.exists(path) and os.path.getsize(path) == info['size']:
+            return path, known['digest']
+        return None
+
+    def register(self, info, path):
+        """Record a finished download; returns (path, digest), path being the existing copy when the content is already known"""
+        digest = file_digest(path)
+        with self._index_lock:
+            index = self._load_index()
+            existing = index['files'].get(digest)
+            if existing and existing != path and os.path.exists(existing):
+                os.remove(path)
+                path = existing
+            index['files'][digest] = path
+            index['urls'][info['url']] = {
+                'size': os.path.getsize(path),
+                'etag': info.get('etag'),
+                'last_modified': info.get('last_modified'),
+                'digest': digest,
+            }
+            self._save_index(index)
+        return path, digest
+
+class DownloadJob:
+    """A download running in a background thread.
+
+    progress_callback(downloaded_bytes, total_size) is called from the
+    download threads, possibly from several at once.
+    """
+    def __init__(self, downloader, info, dest_path, progress_callback=None):
+        self.downloader = downloader
+        self.info = info
+        self.dest_path = dest_path
+        self.part_path = dest_path + '.part'
+        self.state_path = dest_path + '.part.json'
+        self.progress_callback = progress_callback
+
+        self.total_size = info.get('size')
+        self.downloaded_bytes = 0
+        self.resumed_bytes = 0
+        self.path = None
+        self.digest = None
+        self.deduplicated = False
+        self.error = None
+        self.done = False
+        self.elapsed = 0.0
+
+        self._lock = threading.Lock()
+        self._completed_chunks = set()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def result(self, timeout=None):
+        self.thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.path
+
+    def throughput(self):
+        """Bytes per second fetched in this run (resumed bytes excluded)"""
+        fetched = self.downloaded_bytes - self.resumed_bytes
+        return fetched / self.elapsed if self.elapsed > 0 else 0.0
+
+    def _add_progress(self, num_bytes):
+        with self._lock:
+            self.downloaded_bytes += num_bytes
+            downloaded_bytes = self.downloaded_bytes
+        if self.progress_callback is not None:
+            self.progress_callback(downloaded_bytes, self.total_size)
+
+    def _run(self):
+        start = time.time()
+        try:
+            previous = self.downloader.find_previous_download(self.info)
+            if previous is not None:
+                self.path, self.digest = previous
+                self.deduplicated = True
+                self.downloaded_bytes = self.resumed_bytes = os.path.getsize(self.path)
+                return
+
+            if self.info.get('accepts_ranges') and self.total_size:
+                self._download_ranges()
+            else:
+                self._download_stream()
+
+            os.replace(self.part_path, self.dest_path)
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            self.path, self.digest = self.downloader.register(self.info, self.dest_path)
+            self.deduplicated = self.path != self.dest_path
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.time() - start
+            self.done = True
+
+    def _load_state(self, num_chunks):
+        """Chunks already on disk from an interrupted run of the same download.
+
+        Without an ETag or Last-Modified a changed file of the same size cannot
+        be told apart, so such downloads restart from zero.
+        """
+        if not (self.info.get('etag') or self.info.get('last_modified')):
+            return set()
+        if not (os.path.exists(self.state_path) and os.path.exists(self.part_path)):
+            return set()
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        same_download = all(state.get(field) == value for field, value in (
+            ('url', self.info['url']), ('size', self.total_size), ('etag', self.info.get('etag')),
+            ('last_modified', self.info.get('last_modified')), ('chunk_size', self.downloader.chunk_size)))
+        if not same_download or os.path.getsize(self.part_path) != self.total_size:
+            return set()
+        return {index for index in state['completed_chunks'] if 0 <= index < num_chunks}
+
+    def _save_state(self):
+        state = {
+            'url': self.info['url'],
+            'size': self.total_size,
+            'etag': self.info.get('etag'),
+            'last_modified': self.info.get('last_modified'),
+            'chunk_size': self.downloader.chunk_size,
+            'completed_chunks': sorted(self._completed_chunks),
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _chunk_range(self, index):
+        start = index * self.downloader.chunk_size
+        return start, min(start + self.downloader.chunk_size, self.total_size) - 1
+
+    def _download_ranges(self):
+        chunk_size = self.downloader.chunk_size
+        num_chunks = -(-self.total_size // chunk_size)
+
+        self._completed_chunks = self._load_state(num_chunks)
+        if not self._completed_chunks:
+            with open(self.part_path, 'wb') as f:
+                f.truncate(self.total_size)
+        with self._lock:
+            self.resumed_bytes = sum(self._chunk_range(i)[1] - self._chunk_range(i)[0] + 1
+                                     for i in self._completed_chunks)
+            self.downloaded_bytes = self.resumed_bytes
+
+        pending = [i for i in range(num_chunks) if i not in self._completed_chunks]
+        with ThreadPoolExecutor(max_workers=self.downloader.num_connections) as executor:
+            futures = [executor.submit(self._fetch_chunk, index) for index in pending]
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    for other in futures:
+                        other.cancel()
+                    raise future.exception()
+                self._completed_chunks.add(future.result())
+                self._save_state()
+
+    def _fetch_chunk(self, index):
+        start, end = self._chunk_range(index)
+        for attempt in range(self.downloader.retries):
+            written = 0
+            try:
+                with self.downloader._session().get(self.info['url'], headers={'Range': f'bytes={start}-{end}'},
+                                                    stream=True, timeout=self.downloader.timeout) as response:
+                    if response.status_code != 206:
+                        raise RuntimeError(f"Server ignored the range request (HTTP {response.status_code})")
+                    with open(self.part_path, 'r+b', buffering=self.downloader.buffer_size) as f:
+                        f.seek(start)
+                        for data in response.iter_content(chunk_size=self.downloader.buffer_size):
+                            f.write(data)
+                            written += len(data)
+                            self._add_progress(len(data))
+                if written != end - start + 1:
+                    raise RuntimeError(f"Chunk {index} incomplete: {written} of {end - start + 1} bytes")
+                return index
+            except (requests.RequestException, RuntimeError):
+                self._add_progress(-written)
+                if attempt + 1 == self.downloader.retries:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _download_stream(self):
+        # Without range support the file is fetched in one piece and cannot be resumed
+        with self.downloader._session().get(self.info['url'], stream=True, timeout=self.downloader.timeout) as response:
+            response.raise_for_status()
+            if self.total_size is None and response.headers.get('content-length'):
+                self.total_size = int(response.headers['content-length'])
+            with open(self.part_path, 'wb', buffering=self.downloader.buffer_size) as f:
+                for data in response.iter_content(chunk_size=self.downloader.buffer_size):
+                    f.write(data)
+                    self._add_progress(len(data))
+
+def file_digest(path):
+    """Content hash of a file, read in large blocks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
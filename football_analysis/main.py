@@ -9,19 +9,35 @@ import time
 import requests
 from urllib.parse import urlparse, parse_qs
 import tempfile
+import hashlib
+import subprocess
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import threading
 
 sys.path.append('../')
-from utils import read_video, save_video
-from trackers import Tracker
-from team_assigner import TeamAssigner
+from utils import save_video, iter_video_frames, iter_frame_batches, read_frame, get_video_properties, parse_timestamp, get_segment_frames, make_video_readable, NotAVideoError
+from trackers import Tracker, TrackTable
 from player_ball_assigner import PlayerBallAssigner
 from camera_movement_estimator import CameraMovementEstimator
 from view_transformer import ViewTransformer
 from speed_and_distance_estimator import SpeedAndDistance_Estimator
+from pipeline import StagedPipeline
+from track_cache import TrackCache
+from downloader import ParallelDownloader
+from annotation_renderer import AnnotationRenderer, TracksLayer, BallControlLayer, CameraMovementLayer, SpeedAndDistanceLayer, PlayerStatsLayer
+
+# H.264/MP4 when ffmpeg is installed (see VideoSink), so browsers can play the result directly
+OUTPUT_VIDEO_PATH = 'output_videos/output_video.mp4'
+
+# Analysis results reused across runs (see TrackCache)
+CACHE_DIR = 'stubs/cache'
+
+# Frame batches run_analysis_pipeline can hold at once (preprocess, detection, camera
+# and tracking stages; tracking outputs no frames), so the automatic batch size
+# leaves room for all of them
+ANALYSIS_BATCHES_IN_FLIGHT = StagedPipeline.max_items_in_flight(num_stages=4)
 
 def download_video_from_url(url, temp_dir="temp_videos"):
     """
@@ -33,9 +49,6 @@ def download_video_from_url(url, temp_dir="temp_videos"):
     # Criar diretório temporário se não existir
     os.makedirs(temp_dir, exist_ok=True)
     
-    # Gerar nome único para o arquivo
-    timestamp = int(time.time())
-    
     try:
         # Verificar se é uma URL válida
         parsed_url = urlparse(url)
@@ -44,22 +57,27 @@ def download_video_from_url(url, temp_dir="temp_videos"):
         
         print("🔍 Verificando URL...")
         
-        # Primeiro, fazer uma requisição HEAD para obter informações do arquivo
+        # Primeiro, obter informações do arquivo (tamanho, tipo, suporte a download em partes)
+        downloader = ParallelDownloader(download_dir=temp_dir)
         try:
-            head_response = requests.head(url, timeout=10, allow_redirects=True)
-            final_url = head_response.url  # URL final após redirecionamentos
-            content_type = head_response.headers.get('content-type', '').lower()
-            content_length = head_response.headers.get('content-length')
+            download_info = downloader.probe(url)
+            final_url = download_info['url']  # URL final após redirecionamentos
+            content_type = download_info['content_type']
+            content_length = download_info['size']
             
             print(f"📋 Tipo de conteúdo: {content_type}")
             if content_length:
-                size_mb = int(content_length) / 1024 / 1024
+                size_mb = content_length / 1024 / 1024
                 print(f"📏 Tamanho: {size_mb:.1f} MB")
-        except:
+            if download_info['accepts_ranges']:
+                print(f"⚡ Download paralelo com {downloader.num_connections} conexões (retomável)")
+        except requests.exceptions.RequestException:
             print("⚠️  Não foi possível obter informações do cabeçalho, tentando download direto...")
             final_url = url
             content_type = ""
             content_length = None
+            download_info = {'url': url, 'size': None, 'content_type': '', 'etag': None,
+                             'last_modified': None, 'accepts_ranges': False}
         
         # Determinar extensão do arquivo baseada na URL ou content-type
         file_extension = ".mp4"  # padrão
@@ -87,34 +105,40 @@ def download_video_from_url(url, temp_dir="temp_videos"):
             elif '.mkv' in url_lower:
                 file_extension = ".mkv"
         
-        temp_filename = f"downloaded_video_{timestamp}{file_extension}"
+        # Nome estável por URL, para que um download interrompido possa ser retomado
+        url_hash = hashlib.blake2b(final_url.encode(), digest_size=6).hexdigest()
+        temp_filename = f"downloaded_video_{url_hash}{file_extension}"
         temp_path = os.path.join(temp_dir, temp_filename)
         
         print("📥 Iniciando download...")
+        last_report = [0.0]
+        report_lock = threading.Lock()
+
+        def report_progress(downloaded_size, total_size):
+            # Chamado pelas várias conexões do download; progresso no máximo duas vezes por segundo
+            with report_lock:
+                if time.time() - last_report[0] < 0.5:
+                    return
+                last_report[0] = time.time()
+                if total_size:
+                    progress = (downloaded_size / total_size) * 100
+                    print(f"\r   Progresso: {progress:.1f}% ({downloaded_size / 1024 / 1024:.1f}MB / {total_size / 1024 / 1024:.1f}MB)", end='')
+                else:
+                    print(f"\r   Baixado: {downloaded_size / 1024 / 1024:.1f}MB", end='')
+
+        job = downloader.start(download_info, temp_path, progress_callback=report_progress)
+        temp_path = job.result()
+        downloaded_size = os.path.getsize(temp_path)
+
+        # O hash calculado na deduplicação também serve de chave do cache de análise
+        TrackCache(CACHE_DIR).add_fingerprint(temp_path, job.digest)
         
-        # Fazer o download com streaming para arquivos grandes
-        response = requests.get(final_url, stream=True, timeout=60)
-        response.raise_for_status()
-        
-        # Obter tamanho total se disponível
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded_size = 0
-        
-        with open(temp_path, 'wb') as f:
-            print("💾 Salvando arquivo...")
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded_size += len(chunk)
-                    
-                    # Mostrar progresso se soubermos o tamanho total
-                    if total_size > 0:
-                        progress = (downloaded_size / total_size) * 100
-                        print(f"\r   Progresso: {progress:.1f}% ({downloaded_size / 1024 / 1024:.1f}MB / {total_size / 1024 / 1024:.1f}MB)", end='')
-                    else:
-                        print(f"\r   Baixado: {downloaded_size / 1024 / 1024:.1f}MB", end='')
-        
-        print(f"\n✅ Download concluído!")
+        if job.deduplicated:
+            print(f"\n♻️  Vídeo idêntico já baixado anteriormente - reutilizando")
+        else:
+            print(f"\n✅ Download concluído! ({job.throughput() / 1024 / 1024:.1f} MB/s)")
+            if job.resumed_bytes:
+                print(f"   • Retomado: {job.resumed_bytes / 1024 / 1024:.1f}MB já estavam em disco")
         print(f"📁 Arquivo salvo em: {temp_path}")
         print(f"📊 Tamanho total: {downloaded_size / 1024 / 1024:.1f}MB")
         
@@ -126,46 +150,28 @@ def download_video_from_url(url, temp_dir="temp_videos"):
             os.remove(temp_path)
             raise ValueError("Arquivo muito pequeno - provavelmente não é um vídeo")
         
-        # Tentar abrir com OpenCV
-        cap = cv2.VideoCapture(temp_path)
-        if not cap.isOpened():
-            cap.release()
-            
-            # Se falhou, tentar converter com ffmpeg (se disponível)
+        # Tentar abrir com OpenCV; se falhar, o ffprobe diz se o problema é o container
+        # (remux sem recodificar, segundos) ou o codec (recodificação rápida, só vídeo).
+        # O arquivo baixado é mantido: ele é a referência da deduplicação de downloads,
+        # e a versão legível é reutilizada nas próximas execuções
+        try:
+            readable_path, method = make_video_readable(temp_path)
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            raise ValueError("FFmpeg não disponível ou conversão falhou")
+        except NotAVideoError:
+            # Sem nenhuma stream de vídeo: não há o que manter
+            os.remove(temp_path)
+            raise
+        
+        if method != 'original':
             print("⚠️  OpenCV não conseguiu abrir o arquivo diretamente")
-            print("🔄 Tentando conversão para MP4...")
-            
-            converted_path = os.path.join(temp_dir, f"converted_{timestamp}.mp4")
-            
-            # Tentar conversão com ffmpeg
-            try:
-                import subprocess
-                result = subprocess.run([
-                    'ffmpeg', '-i', temp_path, '-c:v', 'libx264', '-c:a', 'aac', 
-                    '-y', converted_path
-                ], capture_output=True, text=True, timeout=300)
-                
-                if result.returncode == 0:
-                    print("✅ Conversão bem-sucedida!")
-                    os.remove(temp_path)  # Remover arquivo original
-                    temp_path = converted_path
-                    
-                    # Tentar abrir novamente
-                    cap = cv2.VideoCapture(temp_path)
-                    if not cap.isOpened():
-                        cap.release()
-                        os.remove(temp_path)
-                        raise ValueError("Arquivo não é um vídeo válido mesmo após conversão")
-                else:
-                    os.remove(temp_path)
-                    raise ValueError("Falha na conversão do vídeo")
-                    
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                os.remove(temp_path)
-                raise ValueError("FFmpeg não disponível ou conversão falhou")
-            except Exception:
-                os.remove(temp_path)
-                raise ValueError("Erro durante a conversão do vídeo")
+            if method == 'remux':
+                print("✅ Container refeito sem recodificar o vídeo (remux)")
+            else:
+                print("✅ Vídeo recodificado para H.264 (preset rápido, sem áudio)")
+            temp_path = readable_path
+        
+        cap = cv2.VideoCapture(temp_path)
         
         # Verificar propriedades do vídeo
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -336,106 +342,236 @@ def get_video_source():
             print("❌ Escolha inválida! Digite 1 ou 2.")
             continue
 
-def draw_player_stats(frames, tracks, chosen_players):
-    """Add comprehensive player statistics overlay to video frames for multiple players"""
-    output_frames = []
-    
-    highlight_colors = [
-        (0, 255, 255),    # Cyan
-        (255, 0, 255),    # Magenta
-        (0, 255, 0),      # Green
-        (255, 165, 0),    # Orange
-        (255, 0, 0),      # Red
-        (128, 0, 128),    # Purple
-        (0, 128, 255),    # Light Blue
-        (255, 255, 0)     # Bright Yellow
-    ]
-    
-    for frame_num, frame in enumerate(frames):
-        frame_copy = frame.copy()
-        
-        # Calculate overlay dimensions based on number of players
-        players_in_frame = []
-        for player_id in chosen_players:
-            if (frame_num < len(tracks['players']) and 
-                player_id in tracks['players'][frame_num]):
-                players_in_frame.append(player_id)
-        
-        if players_in_frame:
-            # Dynamic overlay size based on number of players
-            overlay_height = 60 + (len(players_in_frame) * 25)
-            overlay_width = 500
-            
-            # Draw main overlay
-            overlay = frame_copy.copy()
-            cv2.rectangle(overlay, (10, 10), (overlay_width, overlay_height), (0, 0, 0), -1)
-            alpha = 0.8
-            cv2.addWeighted(overlay, alpha, frame_copy, 1 - alpha, 0, frame_copy)
-            
-            # Header
-            cv2.putText(frame_copy, f"🏃 JOGADORES ANALISADOS ({len(players_in_frame)}/{len(chosen_players)})", 
-                       (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-            
-            # Individual player stats
-            y_offset = 55
-            for i, player_id in enumerate(players_in_frame):
-                player_data = tracks['players'][frame_num][player_id]
-                color = highlight_colors[chosen_players.index(player_id) % len(highlight_colors)]
-                
-                # Get current stats
-                current_speed = player_data.get('speed', 0)
-                current_distance = player_data.get('distance', 0)
-                has_ball = player_data.get('has_ball', False)
-                team = player_data.get('team', 'N/A')
-                
-                # Player info line
-                ball_icon = "⚽" if has_ball else "  "
-                speed_icon = "🚀" if current_speed > 20 else "🏃" if current_speed > 10 else "🚶"
-                
-                player_text = f"{ball_icon}J{player_id} T{team}: {current_speed:.1f}km/h {current_distance:.0f}m {speed_icon}"
-                cv2.putText(frame_copy, player_text, 
-                           (25, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                y_offset += 25
-            
-            # Progress and time info
-            progress = (frame_num + 1) / len(frames) * 100
-            time_elapsed = frame_num / 24  # Assuming 24 FPS
-            cv2.putText(frame_copy, f"Tempo: {time_elapsed:.1f}s | Frame: {frame_num+1}/{len(frames)}", 
-                       (20, overlay_height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (150, 150, 150), 1)
-        
-        else:
-            # No players visible - show warning
-            overlay = frame_copy.copy()
-            cv2.rectangle(overlay, (10, 10), (400, 80), (0, 0, 100), -1)
-            alpha = 0.7
-            cv2.addWeighted(overlay, alpha, frame_copy, 1 - alpha, 0, frame_copy)
-            
-            cv2.putText(frame_copy, f"⚠️  NENHUM JOGADOR SELECIONADO DETECTADO", 
-                       (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
-            cv2.putText(frame_copy, f"Jogadores: {chosen_players}", 
-                       (20, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
-        
-        output_frames.append(frame_copy)
-    
-    return output_frames
+def run_analysis_pipeline(video_path, tracker, camera_movement_estimator, start_frame=0, end_frame=None):
+    """Decode, detect, estimate camera movement and track with the stages overlapping in worker threads.
+
+    Only frames [start_frame, end_frame) are decoded; tracks are indexed from the segment start.
+    """
+    tracks = tracker.init_tracks()
+    camera_movement_per_frame = []
+    camera_movement_estimator.reset()
+    tracker.reset_tracking_state()
+
+    # Downscaled grayscale frames are computed once and shared by camera movement
+    # and, in keyframe mode, by the detector's motion checks (see share_analysis_grays)
+    share_grays = (tracker.keyframe_detector is not None
+                   and tracker.keyframe_detector.downscale == camera_movement_estimator.downscale)
+
+    def preprocess(frame_batch):
+        return frame_batch, [camera_movement_estimator.prepare_gray(frame) for frame in frame_batch]
+
+    def detect(item):
+        frame_batch, gray_batch = item
+        return frame_batch, gray_batch, tracker.detect_frames(frame_batch, gray_batch if share_grays else None)
+
+    def estimate_camera_movement(item):
+        frame_batch, gray_batch, detections = item
+        for frame, frame_gray in zip(frame_batch, gray_batch):
+            camera_movement_per_frame.append(camera_movement_estimator.update(frame, frame_gray))
+        return frame_batch, detections
+
+    def track(item):
+        frame_batch, detections = item
+        for frame, detection in zip(frame_batch, detections):
+            tracker.add_detection_to_tracks(tracks, detection, frame)
+
+    frame_batches = iter_frame_batches(iter_video_frames(video_path, start_frame, end_frame), tracker.batch_size)
+    pipeline = StagedPipeline(frame_batches, [("preprocess", preprocess),
+                                              ("detection", detect),
+                                              ("camera", estimate_camera_movement),
+                                              ("tracking", track)])
+    pipeline.run()
+    tracker.team_assigner.finalize()
+    print_pipeline_report(pipeline)
+
+    if tracker.keyframe_detector is not None:
+        print(f"🎯 YOLO executado em {tracker.keyframe_detector.keyframe_ratio()*100:.1f}% dos frames (keyframes)")
+
+    return tracks, camera_movement_per_frame
+
+def slice_tracks(tracks, start_frame, end_frame):
+    """Frames [start_frame, end_frame) of a tracks dict, re-indexed from 0"""
+    return {object_name: object_tracks[start_frame:end_frame] for object_name, object_tracks in tracks.items()}
+
+def share_analysis_grays(tracker, camera_movement_estimator):
+    """Run keyframe motion checks on the camera estimator's gray frames.
+
+    Must be called before the track cache key is built, since the keyframe
+    downscale is one of the tracker's cache parameters.
+    """
+    if tracker.keyframe_detector is not None:
+        tracker.keyframe_detector.downscale = camera_movement_estimator.downscale
+
+def load_or_run_analysis(video_path, model_path, tracker, camera_movement_estimator, cache,
+                         start_frame=0, end_frame=None, shard_workers=None, shard_overlap_frames=30):
+    """Reuse cached tracks/camera movement for this video, model and parameters when available.
+
+    For a segment [start_frame, end_frame) the results of a previous run over the
+    whole video are sliced when cached; anything missing is computed on the
+    segment frames only and cached under its own key. With shard_workers the
+    tracks are detected in that many worker processes, one time shard each.
+    """
+    tracks_params = tracker.get_cache_params()
+    if shard_workers is not None:
+        # Shard boundaries change the stitched track IDs
+        tracks_params = {**tracks_params, 'sharding': {'workers': shard_workers, 'overlap_frames': shard_overlap_frames}}
+    camera_params = camera_movement_estimator.get_cache_params()
+    tracks_key = cache.make_key('tracks', video_path, model_path=model_path, params=tracks_params)
+    camera_key = cache.make_key('camera_movement', video_path, params=camera_params)
+
+    tracks = tracker.load_cached_tracks(cache, tracks_key)
+    camera_movement_per_frame = cache.get(camera_key)
+
+    if start_frame > 0 or end_frame is not None:
+        if tracks is not None:
+            tracks = slice_tracks(tracks, start_frame, end_frame)
+        if camera_movement_per_frame is not None:
+            camera_movement_per_frame = camera_movement_per_frame[start_frame:end_frame]
+
+        segment = {'start_frame': start_frame, 'end_frame': end_frame}
+        tracks_key = cache.make_key('tracks', video_path, model_path=model_path,
+                                    params={**tracks_params, 'segment': segment})
+        camera_key = cache.make_key('camera_movement', video_path, params={**camera_params, 'segment': segment})
+        if tracks is None:
+            tracks = tracker.load_cached_tracks(cache, tracks_key)
+        if camera_movement_per_frame is None:
+            camera_movement_per_frame = cache.get(camera_key)
+
+    if tracks is None and shard_workers is not None:
+        tracks = tracker.get_object_tracks_sharded(video_path, num_workers=shard_workers,
+                                                   overlap_frames=shard_overlap_frames, cache=cache,
+                                                   cache_key=tracks_key, start_frame=start_frame, end_frame=end_frame)
+        if camera_movement_per_frame is None:
+            camera_movement_per_frame = camera_movement_estimator.get_camera_movement_parallel(
+                video_path, cache=cache, cache_key=camera_key, start_frame=start_frame, end_frame=end_frame)
+        return tracks, camera_movement_per_frame, False
+
+    if tracks is None and camera_movement_per_frame is None:
+        tracks, camera_movement_per_frame = run_analysis_pipeline(video_path, tracker, camera_movement_estimator,
+                                                                  start_frame, end_frame)
+        tracker.save_cached_tracks(cache, tracks_key, tracks)
+        cache.put(camera_key, camera_movement_per_frame)
+        return tracks, camera_movement_per_frame, False
+
+    if tracks is None:
+        print("♻️  Movimento da câmera carregado do cache")
+        tracks = tracker.get_object_tracks(iter_video_frames(video_path, start_frame, end_frame),
+                                           cache=cache, cache_key=tracks_key)
+    elif camera_movement_per_frame is None:
+        print("♻️  Tracks carregados do cache")
+        camera_movement_per_frame = camera_movement_estimator.get_camera_movement_parallel(
+            video_path, cache=cache, cache_key=camera_key, start_frame=start_frame, end_frame=end_frame)
+    else:
+        print("♻️  Tracks e movimento da câmera carregados do cache")
 
+    return tracks, camera_movement_per_frame, True
 
-def analyze_video_and_estimate_time(video_path):
+def render_output_frames(video_path, tracks, team_ball_control, camera_movement_per_frame,
+                         tracker, camera_movement_estimator, speed_and_distance_estimator,
+                         chosen_players, fps=24, start_frame=0):
+    """Decode and annotate frames in worker threads, yielding them in order to the encoder.
+
+    tracks cover the frames from start_frame on, so only that segment is decoded.
+    """
+    total_frames = len(tracks['players'])
+
+    # All overlays are drawn in one pass over each frame, in place
+    renderer = AnnotationRenderer(tracks, [
+        TracksLayer(tracker, highlighted_players=chosen_players),
+        BallControlLayer(tracker, team_ball_control),
+        CameraMovementLayer(camera_movement_estimator, camera_movement_per_frame),
+        SpeedAndDistanceLayer(speed_and_distance_estimator),
+        PlayerStatsLayer(chosen_players, total_frames, fps, start_frame),
+    ])
+
+    def annotate(item):
+        frame_num, frame = item
+        return renderer.render(frame, frame_num)
+
+    numbered_frames = zip(range(total_frames), iter_video_frames(video_path, start_frame, start_frame + total_frames))
+    return StagedPipeline(numbered_frames, [("annotation", annotate)])
+
+def print_pipeline_report(pipeline):
+    stage_times = " | ".join(f"{name} {busy:.1f}s" for name, busy in pipeline.report().items())
+    print(f"⏱️  Tempo por estágio: {stage_times} | total {pipeline.wall_time:.1f}s")
+
+
+def parse_segment_bound(text):
+    """(frame, None) for 'f2250', (None, seconds) for a timestamp such as '1:30'"""
+    text = text.strip().lower()
+    if text.startswith('f'):
+        return int(text[1:]), None
+    return None, parse_timestamp(text)
+
+def get_segment_choice(video_properties):
+    """Ask for a time range of the video; returns (start_frame, end_frame), end_frame None for the whole video"""
+    while True:
+        response = input("\n✂️  Processar apenas um trecho do vídeo? (s/n): ").lower().strip()
+        if response in ['n', 'nao', 'não', 'no', '']:
+            return 0, None
+        if response not in ['s', 'sim', 'y', 'yes']:
+            print("Por favor, responda 's' para sim ou 'n' para não.")
+            continue
+
+        print("   Use segundos (90), mm:ss (1:30), hh:mm:ss (1:02:30) ou f<frame> (f2250)")
+        start_text = input("   Início [início do vídeo]: ").strip()
+        end_text = input("   Fim [fim do vídeo]: ").strip()
+        try:
+            start_frame, start_time = parse_segment_bound(start_text) if start_text else (0, None)
+            end_frame, end_time = parse_segment_bound(end_text) if end_text else (None, None)
+            start_frame, end_frame = get_segment_frames(video_properties, start_frame, end_frame, start_time, end_time)
+        except ValueError as e:
+            print(f"❌ Trecho inválido: {e}")
+            continue
+
+        fps = video_properties['fps']
+        print(f"   ✅ Trecho: frames {start_frame}-{end_frame} ({start_frame / fps:.1f}s - {end_frame / fps:.1f}s)")
+        return start_frame, end_frame
+
+def get_detection_settings():
+    """Ask how objects are detected: YOLO on every frame, only on keyframes with optical
+    flow in between, or on time shards of the video in parallel worker processes"""
+    print("\n⚙️  MODO DE DETECÇÃO")
+    print("1️⃣  Completo (YOLO em todos os frames)")
+    print("2️⃣  Keyframes (YOLO a cada N frames, caixas propagadas por fluxo óptico - mais rápido)")
+    print("3️⃣  Paralelo (trechos do vídeo detectados em vários processos, sem re-identificação por aparência)")
+    while True:
+        choice = input("Digite sua escolha (1, 2 ou 3) [1]: ").strip() or "1"
+        if choice == "1":
+            return {'detection_stride': 1, 'evaluate_keyframes': False, 'shard_workers': None}
+        if choice == "3":
+            default_workers = max(1, (os.cpu_count() or 1) // 2)
+            workers_text = input(f"   Número de processos [{default_workers}]: ").strip() or str(default_workers)
+            if workers_text.isdigit() and int(workers_text) >= 1:
+                return {'detection_stride': 1, 'evaluate_keyframes': False, 'shard_workers': int(workers_text)}
+            print("   ❌ Digite um número inteiro maior ou igual a 1.")
+            continue
+        if choice == "2":
+            break
+        print("❌ Escolha inválida! Digite 1, 2 ou 3.")
+
+    while True:
+        stride_text = input("   Intervalo entre keyframes [5]: ").strip() or "5"
+        if stride_text.isdigit() and int(stride_text) >= 2:
+            break
+        print("   ❌ Digite um número inteiro maior ou igual a 2.")
+    evaluate = input("   Avaliar a precisão contra a detecção completa numa amostra? (s/n) [n]: ").lower().strip()
+    return {'detection_stride': int(stride_text), 'evaluate_keyframes': evaluate in ['s', 'sim', 'y', 'yes'],
+            'shard_workers': None}
+
+def analyze_video_and_estimate_time(video_path, video_properties, start_frame=0, end_frame=None):
     """Analyze video properties and estimate processing time"""
-    import cv2
     import time
     
     print("🔍 ANALISANDO VÍDEO...")
     print("="*50)
     
-    # Get video properties
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    # Get video properties; only the chosen segment is processed
+    total_frames = (end_frame if end_frame is not None else video_properties['frame_count']) - start_frame
+    fps = video_properties['fps']
     duration = total_frames / fps if fps > 0 else 0
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    cap.release()
+    width = video_properties['width']
+    height = video_properties['height']
     
     print(f"📹 Propriedades do vídeo:")
     print(f"   • Arquivo: {video_path}")
@@ -580,44 +716,71 @@ def main():
     
     video_path = get_video_source()
     
+    # Read the stream properties once; the real fps drives every time-based computation
+    video_properties = get_video_properties(video_path)
+    video_fps = video_properties['fps']
+
+    # Optionally restrict the whole analysis to a time range: only that segment is decoded, detected and rendered
+    start_frame, end_frame = get_segment_choice(video_properties)
+    time_offset = start_frame / video_fps
+    
     # Analyze video and get user confirmation
-    should_continue, total_frames, estimated_time = analyze_video_and_estimate_time(video_path)
+    should_continue, total_frames, estimated_time = analyze_video_and_estimate_time(video_path, video_properties,
+                                                                                    start_frame, end_frame)
     
     if not should_continue:
         return
+
+    detection_settings = get_detection_settings()
     
     print(f"\n🚀 INICIANDO PROCESSAMENTO...")
     overall_start_time = time.time()
     
-    # Read Video
-    print("📁 Carregando vídeo...")
-    video_frames = read_video(video_path)
+    # Frames are streamed from disk by every stage instead of being loaded at once,
+    # so peak memory no longer grows with the length of the video
+    print("📁 Abrindo vídeo em modo streaming...")
+    first_frame = read_frame(video_path, start_frame)
 
     # Initialize Tracker
     print("🤖 Inicializando modelo YOLO...")
-    tracker = Tracker('models/best.pt')
-
-    # Get video properties for ID stabilization configuration
-    cap = cv2.VideoCapture(video_path)
-    video_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    video_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    video_fps = cap.get(cv2.CAP_PROP_FPS)
-    cap.release()
-    
+    model_path = 'models/best.pt'
+    tracker = Tracker(model_path, detection_stride=detection_settings['detection_stride'],
+                      batches_in_flight=ANALYSIS_BATCHES_IN_FLIGHT,
+                      frame_size=(video_properties['width'], video_properties['height']))
+    print(f"   • Lote de inferência: {tracker.batch_size} frames")
+    cache = TrackCache(CACHE_DIR)
+
     # Configure ID stabilization based on video properties
-    tracker.configure_stabilization(video_width=video_width, video_height=video_height, fps=video_fps)
+    tracker.configure_stabilization(video_width=video_properties['width'],
+                                    video_height=video_properties['height'],
+                                    fps=video_fps)
 
-    print("👁️  Detectando e rastreando objetos...")
+    # Decode, detection, camera movement and tracking run as overlapping stages
+    print("👁️  Detectando e rastreando objetos e estimando movimento da câmera...")
     step_start = time.time()
-    tracks = tracker.get_object_tracks(video_frames,
-                                       read_from_stub=False,
-                                       stub_path='stubs/track_stubs.pkl')
+    camera_movement_estimator = CameraMovementEstimator(first_frame)
+    share_analysis_grays(tracker, camera_movement_estimator)
+
+    if detection_settings['evaluate_keyframes']:
+        # Compare keyframe mode with full detection on the first seconds of the segment
+        sample_end = start_frame + min(total_frames, int(5 * video_fps))
+        report = tracker.evaluate_keyframe_detection(iter_video_frames(video_path, start_frame, sample_end))
+        print(f"🧪 Modo keyframes: YOLO em {report.pop('keyframe_ratio')*100:.1f}% dos frames da amostra")
+        for class_name, class_report in report.items():
+            print(f"   • {class_name}: recall {class_report['recall']*100:.1f}% | IoU médio {class_report['mean_iou']:.2f}")
+
+    tracks, camera_movement_per_frame, from_cache = load_or_run_analysis(video_path, model_path, tracker,
+                                                                         camera_movement_estimator, cache,
+                                                                         start_frame, end_frame,
+                                                                         detection_settings['shard_workers'])
     print(f"✅ Detecção concluída em {time.time() - step_start:.1f}s")
     
     # Show ID stabilization statistics
-    if hasattr(tracker, 'player_history'):
-        stable_players = len([p for p in tracker.player_history.values() if p['last_seen'] >= len(video_frames) - 30])
-        total_mappings = len(tracker.id_mapping)
+    if from_cache:
+        print("🔄 Tracks reutilizados de uma análise anterior deste vídeo")
+    elif hasattr(tracker, 'id_stabilizer'):
+        stable_players = len([p for p in tracker.id_stabilizer.history.values() if p['last_seen'] >= len(tracks['players']) - 30])
+        total_mappings = len(tracker.id_stabilizer.id_mapping)
         print(f"🔄 Sistema de estabilização de IDs ativo:")
         print(f"   • Jogadores com tracking estável: {stable_players}")
         print(f"   • Total de IDs mapeados: {total_mappings}")
@@ -628,54 +791,52 @@ def main():
     else:
         print("⚠️  Sistema de estabilização não inicializado")
     
+    # Interpolate Ball Positions
+    print("⚽ Interpolando posições da bola...")
+    tracks["ball"] = tracker.interpolate_ball_positions(tracks["ball"])
+
+    # From here on the tracks live in a columnar table and every stage works on
+    # whole columns; `tracks` becomes a read-only view with the old dict
+    # interface for the drawing code
+    table = TrackTable.from_tracks(tracks)
+    tracks = table.view()
+
     # Get object positions 
     print("📍 Calculando posições dos objetos...")
-    tracker.add_position_to_tracks(tracks)
+    tracker.add_position_to_table(table)
 
     # camera movement estimator
-    print("📹 Estimando movimento da câmera...")
-    step_start = time.time()
-    camera_movement_estimator = CameraMovementEstimator(video_frames[0])
-    camera_movement_per_frame = camera_movement_estimator.get_camera_movement(video_frames,
-                                                                                read_from_stub=False,
-                                                                                stub_path='stubs/camera_movement_stub.pkl')
-    camera_movement_estimator.add_adjust_positions_to_tracks(tracks,camera_movement_per_frame)
-    print(f"✅ Movimento da câmera calculado em {time.time() - step_start:.1f}s")
+    print("📹 Compensando movimento da câmera...")
+    camera_movement_estimator.add_adjust_positions_to_table(table,camera_movement_per_frame)
 
     # View Trasnformer
     print("🗺️  Transformando perspectiva...")
     view_transformer = ViewTransformer()
-    view_transformer.add_transformed_position_to_tracks(tracks)
-
-    # Interpolate Ball Positions
-    print("⚽ Interpolando posições da bola...")
-    tracks["ball"] = tracker.interpolate_ball_positions(tracks["ball"])
+    view_transformer.add_transformed_position_to_table(table)
 
     # Speed and distance estimator
     print("🏃 Calculando velocidades e distâncias...")
-    speed_and_distance_estimator = SpeedAndDistance_Estimator()
-    speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
+    speed_and_distance_estimator = SpeedAndDistance_Estimator(frame_rate=video_fps, sliding_window=True)
+    speed_and_distance_estimator.add_speed_and_distance_to_table(table)
 
     # Show available players and let user choose one
-    available_players = set()
-    for frame_players in tracks['players']:
-        available_players.update(frame_players.keys())
+    available_players = set(table.track_ids('players'))
     
     # Create a preview image with player IDs
     # Use a frame from the middle of the video where tracking is more stable
-    middle_frame_idx = min(len(tracks['players']) // 3, 50)  # Frame around 1/3 of video or frame 50
+    middle_frame_idx = min(table.num_frames // 3, 50)  # Frame around 1/3 of video or frame 50
     
     # Find the best frame around the middle with most players
     best_frame_idx = middle_frame_idx
     max_players = 0
-    search_range = range(max(0, middle_frame_idx - 5), min(len(tracks['players']), middle_frame_idx + 6))
+    search_range = range(max(0, middle_frame_idx - 5), min(table.num_frames, middle_frame_idx + 6))
     
     for idx in search_range:
-        if len(tracks['players'][idx]) > max_players:
-            max_players = len(tracks['players'][idx])
+        if len(table.frame_rows(idx, 'players')) > max_players:
+            max_players = len(table.frame_rows(idx, 'players'))
             best_frame_idx = idx
     
-    preview_frame = video_frames[best_frame_idx].copy()
+    preview_frame = read_frame(video_path, start_frame + best_frame_idx)
     
     print(f"🎯 Usando frame {best_frame_idx + 1} para preview (onde tracking está mais estável)")
     
@@ -711,8 +872,8 @@ def main():
     ]
     
     for i, frame_idx in enumerate(additional_frames):
-        if frame_idx < len(tracks['players']) and len(tracks['players'][frame_idx]) > 0:
-            add_frame = video_frames[frame_idx].copy()
+        if frame_idx < table.num_frames and len(table.frame_rows(frame_idx, 'players')) > 0:
+            add_frame = read_frame(video_path, start_frame + frame_idx)
             
             # Draw players on additional frame
             for player_id, player_data in tracks['players'][frame_idx].items():
@@ -749,10 +910,7 @@ def main():
     print("="*60)
     
     # Analyze player ID stability
-    player_frame_count = {}
-    for frame_players in tracks['players']:
-        for player_id in frame_players.keys():
-            player_frame_count[player_id] = player_frame_count.get(player_id, 0) + 1
+    player_frame_count = table.track_lengths('players')
     
     # Sort players by how often they appear (most stable IDs first)
     stable_players = sorted(player_frame_count.items(), key=lambda x: x[1], reverse=True)
@@ -760,24 +918,25 @@ def main():
     print("\nJOGADORES DETECTADOS NO VÍDEO (ordenados por estabilidade):")
     print("-" * 55)
     for player_id, frame_count in stable_players:
-        percentage = (frame_count / len(tracks['players'])) * 100
-        print(f"🏃 Jogador ID: {player_id:2d} | Aparece em {frame_count:3d}/{len(tracks['players'])} frames ({percentage:5.1f}%)")
+        percentage = (frame_count / table.num_frames) * 100
+        print(f"🏃 Jogador ID: {player_id:2d} | Aparece em {frame_count:3d}/{table.num_frames} frames ({percentage:5.1f}%)")
     
     print(f"\n💡 DICA: IDs com maior % são mais estáveis e confiáveis!")
     
     # Detect and report ID changes/inconsistencies
-    def detect_id_changes(tracks):
+    def detect_id_changes(table):
         """Analyze tracking consistency and report potential issues"""
         frame_transitions = []
         
-        for frame_num in range(1, len(tracks['players'])):
-            prev_frame = tracks['players'][frame_num - 1]
-            curr_frame = tracks['players'][frame_num]
+        prev_frame = set(table.track_id[table.frame_rows(0, 'players')].tolist()) if table.num_frames else set()
+        for frame_num in range(1, table.num_frames):
+            curr_frame = set(table.track_id[table.frame_rows(frame_num, 'players')].tolist())
             
             # Players that disappeared
-            disappeared = set(prev_frame.keys()) - set(curr_frame.keys())
+            disappeared = prev_frame - curr_frame
             # New players that appeared
-            appeared = set(curr_frame.keys()) - set(prev_frame.keys())
+            appeared = curr_frame - prev_frame
+            prev_frame = curr_frame
             
             if disappeared or appeared:
                 frame_transitions.append({
@@ -788,7 +947,7 @@ def main():
         
         return frame_transitions
     
-    id_changes = detect_id_changes(tracks)
+    id_changes = detect_id_changes(table)
     if len(id_changes) > 0:
         critical_changes = [c for c in id_changes if len(c['disappeared']) > 0 and len(c['appeared']) > 0]
         print(f"\n🔄 ANÁLISE DE CONSISTÊNCIA DO TRACKING:")
@@ -808,7 +967,7 @@ def main():
         if len(critical_changes) > 0:
             print(f"\n   📝 Exemplos de mudanças (primeiros 3):")
             for i, change in enumerate(critical_changes[:3]):
-                frame_time = change['frame'] / 24
+                frame_time = time_offset + change['frame'] / video_fps
                 print(f"      Frame {change['frame']} ({frame_time:.1f}s): IDs {change['disappeared']} → {change['appeared']}")
     else:
         print(f"\n✅ TRACKING PERFEITO: Nenhuma mudança de ID detectada!")
@@ -842,60 +1001,49 @@ def main():
             print("❌ Por favor, digite números válidos separados por vírgula (ex: 7,12,15).")
 
     # Assign Player Teams
+    # Jersey colours were sampled during tracking; each player's team is its majority vote
     print("👕 Analisando cores dos times...")
     step_start = time.time()
-    team_assigner = TeamAssigner()
-    team_assigner.assign_team_color(video_frames[0], 
-                                    tracks['players'][0])
-    
-    for frame_num, player_track in enumerate(tracks['players']):
-        for player_id, track in player_track.items():
-            team = team_assigner.get_player_team(video_frames[frame_num],   
-                                                 track['bbox'],
-                                                 player_id)
-            tracks['players'][frame_num][player_id]['team'] = team 
-            tracks['players'][frame_num][player_id]['team_color'] = team_assigner.team_colors[team]
+    team_assigner = tracker.team_assigner
+
+    player_rows = np.flatnonzero(table.object_mask('players'))
+    table.team[player_rows] = team_assigner.get_teams(table.track_id[player_rows])
+    table.team_colors = team_assigner.team_colors
     print(f"✅ Times identificados em {time.time() - step_start:.1f}s")
     
     # Assign Ball Aquisition
     print("⚽ Analisando posse de bola...")
     player_assigner =PlayerBallAssigner()
-    team_ball_control= []
-    for frame_num, player_track in enumerate(tracks['players']):
-        ball_bbox = tracks['ball'][frame_num][1]['bbox']
-        assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
-
-        if assigned_player != -1:
-            tracks['players'][frame_num][assigned_player]['has_ball'] = True
-            team_ball_control.append(tracks['players'][frame_num][assigned_player]['team'])
-        else:
-            # If no team_ball_control history exists, default to team 1
-            if len(team_ball_control) == 0:
-                team_ball_control.append(1)
-            else:
-                team_ball_control.append(team_ball_control[-1])
-    team_ball_control= np.array(team_ball_control)
+    ball_rows = np.flatnonzero(table.object_mask('ball'))
+    ball_bboxes = np.full((table.num_frames, 4), np.nan)
+    ball_bboxes[table.frame[ball_rows]] = table.bbox[ball_rows]
+    player_rows = np.flatnonzero(table.object_mask('players'))
+    _, assigned_rows = player_assigner.assign_ball_to_players(ball_bboxes,
+                                                              table.frame[player_rows],
+                                                              table.track_id[player_rows],
+                                                              table.bbox[player_rows])
+    has_ball_rows = player_rows[assigned_rows[assigned_rows >= 0]]
+    table.has_ball[has_ball_rows] = True
 
+    assigned_teams = np.zeros(table.num_frames, dtype=np.int64)
+    assigned_teams[assigned_rows >= 0] = table.team[has_ball_rows]
+    team_ball_control = player_assigner.get_team_ball_control(assigned_teams)
 
-    # Draw output 
-    print("🎨 Gerando vídeo final...")
-    step_start = time.time()
-    
-    ## Draw object Tracks
-    output_video_frames = tracker.draw_annotations(video_frames, tracks,team_ball_control, highlighted_players=chosen_players)
-
-    ## Draw Camera movement
-    output_video_frames = camera_movement_estimator.draw_camera_movement(output_video_frames,camera_movement_per_frame)
 
-    ## Draw Speed and Distance
-    speed_and_distance_estimator.draw_speed_and_distance(output_video_frames,tracks)
-    
-    ## Add player statistics overlay
-    output_video_frames = draw_player_stats(output_video_frames, tracks, chosen_players)
+    # Draw output and save it frame by frame
+    print("🎨 Gerando e salvando vídeo final...")
+    step_start = time.time()
+    output_video_frames = render_output_frames(video_path, tracks, team_ball_control, camera_movement_per_frame,
+                                               tracker, camera_movement_estimator, speed_and_distance_estimator,
+                                               chosen_players, fps=video_fps, start_frame=start_frame)
+    encode_stats = save_video(output_video_frames, OUTPUT_VIDEO_PATH, fps=video_fps)
+    print_pipeline_report(output_video_frames)
+    print(f"🎞️  Codificação ({encode_stats['backend']}): {encode_stats['frames']} frames, "
+          f"{encode_stats['encode_fps']:.1f} frames/s, {encode_stats['file_size'] / 1e6:.1f} MB")
     print(f"✅ Vídeo renderizado em {time.time() - step_start:.1f}s")
 
     # Comprehensive player analysis
-    def analyze_player_comprehensive(tracks, player_id):
+    def analyze_player_comprehensive(table, player_id):
         stats = {
             'total_distance': 0,
             'max_speed': 0,
@@ -912,38 +1060,36 @@ def main():
             'distance_per_period': []
         }
         
-        frame_rate = 24  # FPS
-        video_length = len(tracks['players'])
+        frame_rate = video_fps
+        video_length = table.num_frames
         
-        for frame_num, frame_players in enumerate(tracks['players']):
-            if player_id in frame_players:
-                player_data = frame_players[player_id]
-                stats['frames_present'] += 1
-                
-                # Distance and speed
-                if 'distance' in player_data:
-                    stats['total_distance'] = max(stats['total_distance'], player_data['distance'])
-                
-                if 'speed' in player_data:
-                    speed = player_data['speed']
-                    stats['speed_samples'].append(speed)
-                    stats['max_speed'] = max(stats['max_speed'], speed)
-                    stats['min_speed'] = min(stats['min_speed'], speed)
-                    
-                    if speed > 20:  # Sprint threshold
-                        stats['high_speed_moments'] += 1
-                
-                # Team info
-                if 'team' in player_data:
-                    stats['team'] = player_data['team']
-                
-                # Ball possession
-                if player_data.get('has_ball', False):
-                    stats['frames_with_ball'] += 1
-                
-                # Position tracking for field coverage
-                if 'position_transformed' in player_data and player_data['position_transformed']:
-                    stats['position_history'].append(player_data['position_transformed'])
+        rows = table.track_rows('players', player_id)
+        speeds = table.speed[rows]
+        distances = table.distance[rows]
+        speeds = speeds[~np.isnan(speeds)]
+        teams = table.team[rows]
+        positions = table.position_transformed[rows]
+        
+        stats['frames_present'] = len(rows)
+        
+        # Distance and speed
+        if not np.all(np.isnan(distances)):
+            stats['total_distance'] = max(stats['total_distance'], float(np.nanmax(distances)))
+        stats['speed_samples'] = speeds.tolist()
+        if len(speeds):
+            stats['max_speed'] = max(stats['max_speed'], float(speeds.max()))
+            stats['min_speed'] = float(speeds.min())
+        stats['high_speed_moments'] = int(np.count_nonzero(speeds > 20))  # Sprint threshold
+        
+        # Team info
+        if np.any(teams > 0):
+            stats['team'] = int(teams[teams > 0][-1])
+        
+        # Ball possession
+        stats['frames_with_ball'] = int(np.count_nonzero(table.has_ball[rows]))
+        
+        # Position tracking for field coverage
+        stats['position_history'] = positions[~np.isnan(positions[:, 0])].tolist()
         
         # Calculate derived stats
         if stats['speed_samples']:
@@ -959,16 +1105,17 @@ def main():
         
         # Calculate distance in different periods (quarters)
         quarter_size = video_length // 4
+        rows_with_distance = rows[~np.isnan(table.distance[rows])]
+        frames_with_distance = table.frame[rows_with_distance]
         for i in range(4):
             start_frame = i * quarter_size
             end_frame = min((i + 1) * quarter_size, video_length)
             quarter_distance = 0
             
-            for frame_num in range(start_frame, end_frame):
-                if (frame_num < len(tracks['players']) and 
-                    player_id in tracks['players'][frame_num] and 
-                    'distance' in tracks['players'][frame_num][player_id]):
-                    quarter_distance = tracks['players'][frame_num][player_id]['distance']
+            # Last distance reading of the player inside this quarter
+            in_quarter = (frames_with_distance >= start_frame) & (frames_with_distance < end_frame)
+            if np.any(in_quarter):
+                quarter_distance = float(table.distance[rows_with_distance[in_quarter][-1]])
             
             # Distance in this quarter is the difference
             prev_distance = stats['distance_per_period'][-1] if stats['distance_per_period'] else 0
@@ -981,10 +1128,10 @@ def main():
     all_highlight_metrics = {}
     
     for player_id in chosen_players:
-        all_player_stats[player_id] = analyze_player_comprehensive(tracks, player_id)
+        all_player_stats[player_id] = analyze_player_comprehensive(table, player_id)
     
     # Calculate highlight-specific metrics for 30-second videos
-    def calculate_highlight_metrics(tracks, player_id):
+    def calculate_highlight_metrics(table, player_id):
         highlights = {
             'peak_speed': 0,
             'explosive_moments': [],  # Sudden speed increases
@@ -997,47 +1144,39 @@ def main():
             'highlight_rating': 0  # Overall highlight quality (1-10)
         }
         
-        speeds = []
-        with_ball_distances = []
-        without_ball_distances = []
+        rows = table.track_rows('players', player_id)
+        frames = table.frame[rows]
+        speed_values = np.nan_to_num(table.speed[rows], nan=0.0)
+        distance_values = np.nan_to_num(table.distance[rows], nan=0.0)
+        has_ball = table.has_ball[rows]
         
-        for frame_num, frame_players in enumerate(tracks['players']):
-            if player_id in frame_players:
-                player_data = frame_players[player_id]
-                speed = player_data.get('speed', 0)
-                has_ball = player_data.get('has_ball', False)
-                distance = player_data.get('distance', 0)
-                
-                speeds.append((frame_num, speed))
-                
-                # Track distances with/without ball
-                if has_ball:
-                    with_ball_distances.append(distance)
-                    # Mark as ball impact moment if speed > 15 km/h
-                    if speed > 15:
-                        highlights['ball_impact_moments'].append({
-                            'frame': frame_num,
-                            'speed': speed,
-                            'timestamp': frame_num / 24
-                        })
-                else:
-                    without_ball_distances.append(distance)
-                
-                # Detect explosive moments (acceleration)
-                if len(speeds) > 5:
-                    prev_speed = speeds[-6][1]
-                    acceleration = speed - prev_speed
-                    if acceleration > 8:  # Significant acceleration
-                        highlights['explosive_moments'].append({
-                            'frame': frame_num,
-                            'acceleration': acceleration,
-                            'final_speed': speed,
-                            'timestamp': frame_num / 24
-                        })
-                
-                # Count sprint bursts
-                if speed > 22:  # Elite sprint speed
-                    highlights['sprint_bursts'] += 1
+        speeds = list(zip(frames.tolist(), speed_values.tolist()))
+        
+        # Track distances with/without ball
+        with_ball_distances = distance_values[has_ball].tolist()
+        without_ball_distances = distance_values[~has_ball].tolist()
+        
+        # Mark as ball impact moment if speed > 15 km/h
+        for frame_num, speed in zip(frames[has_ball & (speed_values > 15)].tolist(),
+                                    speed_values[has_ball & (speed_values > 15)].tolist()):
+            highlights['ball_impact_moments'].append({
+                'frame': frame_num,
+                'speed': speed,
+                'timestamp': time_offset + frame_num / video_fps
+            })
+        
+        # Detect explosive moments (acceleration over the last 5 appearances)
+        accelerations = speed_values[5:] - speed_values[:-5]
+        for i in np.flatnonzero(accelerations > 8):  # Significant acceleration
+            highlights['explosive_moments'].append({
+                'frame': int(frames[i + 5]),
+                'acceleration': float(accelerations[i]),
+                'final_speed': float(speed_values[i + 5]),
+                'timestamp': time_offset + int(frames[i + 5]) / video_fps
+            })
+        
+        # Count sprint bursts
+        highlights['sprint_bursts'] = int(np.count_nonzero(speed_values > 22))  # Elite sprint speed
         
         # Calculate top speed moments
         speeds_sorted = sorted(speeds, key=lambda x: x[1], reverse=True)
@@ -1063,7 +1202,7 @@ def main():
     
     # Calculate highlight metrics for all players
     for player_id in chosen_players:
-        all_highlight_metrics[player_id] = calculate_highlight_metrics(tracks, player_id)
+        all_highlight_metrics[player_id] = calculate_highlight_metrics(table, player_id)
     
     # Display comprehensive comparative analysis
     print("\n" + "="*80)
@@ -1113,7 +1252,7 @@ def main():
         if highlight_metrics['critical_speed_moments']:
             print(f"\n🏆 TOP 3 VELOCIDADES:")
             for j, (frame, speed) in enumerate(highlight_metrics['critical_speed_moments'][:3]):
-                timestamp = frame / 24
+                timestamp = time_offset + frame / video_fps
                 print(f"   {j+1}. {speed:.1f} km/h aos {timestamp:.1f}s")
     
     # Comparative rankings
@@ -1161,10 +1300,6 @@ def main():
     print(f"\n🎥 Vídeo gerado com {len(chosen_players)} jogador(es) destacado(s) em cores diferentes!")
     print("="*80)
 
-    # Save video
-    print("💾 Salvando vídeo...")
-    save_video(output_video_frames, 'output_videos/output_video.avi')
-    
     # Calculate total time and show summary
     total_elapsed = time.time() - overall_start_time
     estimated_accuracy = ((estimated_time - total_elapsed) / estimated_time) * 100
@@ -1175,7 +1310,7 @@ def main():
     print(f"⏱️  Tempo estimado: {estimated_time/60:.1f} minutos")
     print(f"⏱️  Tempo real: {total_elapsed/60:.1f} minutos")
     print(f"🎯 Precisão da estimativa: {100-abs(estimated_accuracy):.1f}%")
-    print(f"📁 Vídeo salvo em: output_videos/output_video.avi")
+    print(f"📁 Vídeo salvo em: {OUTPUT_VIDEO_PATH}")
     print(f"🏃 Jogadores {chosen_players} destacados com cores diferentes")
     print(f"📊 Relatório comparativo completo exibido acima")
     
@@ -0,0 +1 @@
+from .staged_pipeline import StagedPipeline
\ No newline at end of file
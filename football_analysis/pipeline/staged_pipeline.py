@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+
+_END = object()
+
+class PipelineStage:
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        self.busy_time = 0.0
+        self.items = 0
+
+class StagedPipeline:
+    """Producer/consumer engine: source -> stage -> ... -> consumer.
+
+    The source and every stage run in their own thread and are connected by
+    bounded queues, so a slow stage blocks the ones before it (back-pressure)
+    instead of letting decoded frames pile up in memory. Items keep their
+    order because each stage is served by exactly one thread.
+    """
+    def __init__(self, source, stages, queue_size=4):
+        self.source = source
+        self.stages = [PipelineStage(name, fn) for name, fn in stages]
+        self.source_stage = PipelineStage("decode", None)
+        self.queue_size = queue_size
+        self.wall_time = 0.0
+
+        self._queues = []
+        self._threads = []
+        self._stop = threading.Event()
+        self._error = None
+
+    @staticmethod
+    def max_items_in_flight(num_stages, queue_size=4, output_queue=False):
+        """Most source items a pipeline can hold at once: the full queue in front
+        of every stage plus one item per thread. The last stage's output queue is
+        only counted with output_queue, when its results still hold the items.
+        """
+        num_queues = num_stages + 1 if output_queue else num_stages
+        return num_queues * queue_size + num_stages + 1
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _run_source(self, out_queue):
+        stage = self.source_stage
+        try:
+            iterator = iter(self.source)
+            while True:
+                start = time.time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stage.busy_time += time.time() - start
+                stage.items += 1
+                if not self._put(out_queue, item):
+                    return
+            self._put(out_queue, _END)
+        except BaseException as e:
+            self._fail(e)
+
+    def _run_stage(self, stage, in_queue, out_queue):
+        try:
+            while True:
+                item = self._get(in_queue)
+                if item is _END:
+                    self._put(out_queue, _END)
+                    return
+                start = time.time()
+                result = stage.fn(item)
+                stage.busy_time += time.time() - start
+                stage.items += 1
+                if not self._put(out_queue, result):
+                    return
+        except BaseException as e:
+            self._fail(e)
+
+    def _start(self):
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self._threads = [threading.Thread(target=self._run_source, args=(self._queues[0],), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            self._threads.append(threading.Thread(target=self._run_stage,
+                                                  args=(stage, self._queues[i], self._queues[i + 1]),
+                                                  daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def __iter__(self):
+        start = time.time()
+        self._start()
+        try:
+            while True:
+                item = self._get(self._queues[-1])
+                if item is _END:
+                    break
+                yield item
+        finally:
+            # Also reached when the consumer stops early: unblock every thread
+            self._stop.set()
+            for thread in self._threads:
+                thread.join()
+            self.wall_time = time.time() - start
+
+        if self._error is not None:
+            raise self._error
+
+    def run(self):
+        """Drain the pipeline, for stages that work by side effect"""
+        for _ in self:
+            pass
+
+    def report(self):
+        """Busy seconds per stage; wall time tends to the slowest one"""
+        stages = [self.source_stage] + self.stages
+        return {stage.name: stage.busy_time for stage in stages}
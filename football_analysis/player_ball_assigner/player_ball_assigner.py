@@ -1,3 +1,4 @@
+import numpy as np
 import sys 
 sys.path.append('../')
 from utils import get_center_of_bbox, measure_distance
@@ -24,4 +25,52 @@ class PlayerBallAssigner():
                     miniumum_distance = distance
                     assigned_player = player_id
 
-        return assigned_player
\ No newline at end of file
+        return assigned_player
+
+    def assign_ball_to_players(self, ball_bboxes, player_frames, player_ids, player_bboxes):
+        """Resolve ball possession for every frame of the video at once.
+
+        ball_bboxes is (num_frames, 4) with NaN rows where there is no ball, and
+        player_frames/player_ids/player_bboxes hold one entry per player
+        detection. Returns, per frame, the id of the player with the ball (-1 if
+        nobody is close enough) and the index of that detection (-1 if none).
+        """
+        ball_bboxes = np.asarray(ball_bboxes, dtype=np.float64).reshape(-1, 4)
+        player_frames = np.asarray(player_frames, dtype=np.int64)
+        player_ids = np.asarray(player_ids)
+        player_bboxes = np.asarray(player_bboxes, dtype=np.float64).reshape(-1, 4)
+        num_frames = len(ball_bboxes)
+
+        assigned_players = np.full(num_frames, -1, dtype=np.int64)
+        assigned_rows = np.full(num_frames, -1, dtype=np.int64)
+        if len(player_frames) == 0:
+            return assigned_players, assigned_rows
+
+        # Integer ball centers, like get_center_of_bbox
+        ball_centers = np.trunc(np.stack([(ball_bboxes[:,0] + ball_bboxes[:,2]) / 2,
+                                          (ball_bboxes[:,1] + ball_bboxes[:,3]) / 2], axis=1))
+        ball_position = ball_centers[player_frames]
+
+        # Distance from the ball to the closest bottom corner of each player box
+        distance_left = np.hypot(player_bboxes[:,0] - ball_position[:,0], player_bboxes[:,3] - ball_position[:,1])
+        distance_right = np.hypot(player_bboxes[:,2] - ball_position[:,0], player_bboxes[:,3] - ball_position[:,1])
+        distance = np.fmin(distance_left, distance_right)
+
+        candidates = np.flatnonzero(distance < self.max_player_ball_distance)
+        if len(candidates) == 0:
+            return assigned_players, assigned_rows
+
+        # Closest candidate per frame: sort by (frame, distance) and keep the first of each frame
+        order = candidates[np.lexsort((distance[candidates], player_frames[candidates]))]
+        frames, first = np.unique(player_frames[order], return_index=True)
+        assigned_rows[frames] = order[first]
+        assigned_players[frames] = player_ids[order[first]]
+
+        return assigned_players, assigned_rows
+
+    def get_team_ball_control(self, assigned_teams, default_team=1):
+        """Team in control per frame; frames without an assigned player keep the previous team"""
+        assigned_teams = np.asarray(assigned_teams)
+        last_assigned = np.where(assigned_teams > 0, np.arange(len(assigned_teams)), -1)
+        last_assigned = np.maximum.accumulate(last_assigned) if len(last_assigned) else last_assigned
+        return np.where(last_assigned >= 0, assigned_teams[np.maximum(last_assigned, 0)], default_team)
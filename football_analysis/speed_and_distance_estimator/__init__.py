@@ -1 +1,2 @@
-from .speed_and_distance_estimator import SpeedAndDistance_Estimator
\ No newline at end of file
+from .speed_and_distance_estimator import SpeedAndDistance_Estimator
+from .sliding_window_speed_estimator import SlidingWindowSpeedEstimator
\ No newline at end of file
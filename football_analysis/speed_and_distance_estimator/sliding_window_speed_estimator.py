@@ -0,0 +1,52 @@
+from collections import deque
+import sys 
+sys.path.append('../')
+from utils import measure_distance
+
+class SlidingWindowSpeedEstimator:
+    """Streaming speed and distance, updated one frame at a time.
+
+    Each track keeps a ring buffer of its positions over the last frame_window
+    frames, so every update is O(1) per track: the speed is the displacement
+    between the newest position and the oldest one still in the window, and
+    the distance grows by the displacement since the last anchor point each
+    time a full window has elapsed.
+    """
+    def __init__(self, frame_rate=24, window_seconds=5/24):
+        self.frame_rate = frame_rate
+        self.frame_window = max(1, int(round(window_seconds * frame_rate)))
+
+        self.history = {}  # {track_id: deque[(frame_num, position)]}
+        self.anchors = {}  # {track_id: (frame_num, position)} last point counted in the distance
+        self.total_distance = {}
+
+    def update(self, frame_num, positions):
+        """positions: {track_id: (x, y) in meters or None}; returns {track_id: (speed_km_per_hour, distance)}"""
+        results = {}
+        for track_id, position in positions.items():
+            if position is None:
+                continue
+
+            history = self.history.setdefault(track_id, deque())
+            history.append((frame_num, position))
+            while history[0][0] < frame_num - self.frame_window:
+                history.popleft()
+
+            if track_id not in self.anchors:
+                self.anchors[track_id] = (frame_num, position)
+                self.total_distance[track_id] = 0
+
+            anchor_frame, anchor_position = self.anchors[track_id]
+            if frame_num - anchor_frame >= self.frame_window:
+                self.total_distance[track_id] += measure_distance(anchor_position, position)
+                self.anchors[track_id] = (frame_num, position)
+
+            oldest_frame, oldest_position = history[0]
+            if oldest_frame == frame_num:
+                continue
+
+            time_elapsed = (frame_num - oldest_frame) / self.frame_rate
+            speed_meteres_per_second = measure_distance(oldest_position, position) / time_elapsed
+            results[track_id] = (speed_meteres_per_second * 3.6, self.total_distance[track_id])
+
+        return results
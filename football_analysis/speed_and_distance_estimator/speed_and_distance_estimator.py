@@ -1,12 +1,15 @@
 import cv2
+import numpy as np
 import sys 
 sys.path.append('../')
 from utils import measure_distance ,get_foot_position
 
 class SpeedAndDistance_Estimator():
-    def __init__(self):
-        self.frame_window=5
-        self.frame_rate=24
+    def __init__(self, frame_rate=24, window_seconds=5/24, sliding_window=False):
+        self.frame_rate=frame_rate
+        # The window covers the same time span at any fps (5 frames at 24 fps)
+        self.frame_window=max(1, int(round(window_seconds*frame_rate)))
+        self.sliding_window=sliding_window
     
     def add_speed_and_distance_to_tracks(self,tracks):
         total_distance= {}
@@ -47,27 +50,167 @@ class SpeedAndDistance_Estimator():
                         tracks[object][frame_num_batch][track_id]['speed'] = speed_km_per_hour
                         tracks[object][frame_num_batch][track_id]['distance'] = total_distance[object][track_id]
     
+    def add_speed_and_distance_to_table(self, table):
+        """Vectorized add_speed_and_distance_to_tracks over the players of a TrackTable.
+
+        Uses the same frame_window blocks, so the results are identical: a block's
+        speed is the displacement between its first and last frame, and each
+        track's distance accumulates block by block.
+        """
+        if self.sliding_window:
+            return self.add_sliding_speed_and_distance_to_table(table)
+
+        num_frames = table.num_frames
+        rows = np.flatnonzero(table.object_mask('players'))
+        if len(rows) == 0:
+            return
+
+        frames = table.frame[rows].astype(np.int64)
+        track_ids = table.track_id[rows].astype(np.int64)
+        positions = table.position_transformed[rows].astype(np.float64)
+
+        # (track id, frame) -> row lookup through one sorted key array
+        keys = track_ids * (num_frames + 1) + frames
+        key_order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[key_order]
+
+        # Blocks start every frame_window frames and end frame_window frames later (or on the last frame)
+        start_rows = np.flatnonzero(frames % self.frame_window == 0)
+        start_frames = frames[start_rows]
+        end_frames = np.minimum(start_frames + self.frame_window, num_frames - 1)
+
+        end_keys = track_ids[start_rows] * (num_frames + 1) + end_frames
+        end_index = np.minimum(np.searchsorted(sorted_keys, end_keys), len(sorted_keys) - 1)
+        end_rows = key_order[end_index]
+
+        valid = (sorted_keys[end_index] == end_keys) & (end_frames > start_frames)
+        valid &= ~np.isnan(positions[start_rows, 0]) & ~np.isnan(positions[end_rows, 0])
+        start_rows, end_rows = start_rows[valid], end_rows[valid]
+        start_frames, end_frames = start_frames[valid], end_frames[valid]
+        block_tracks = track_ids[start_rows]
+
+        displacement = positions[start_rows] - positions[end_rows]
+        distance_covered = np.sqrt(displacement[:, 0]**2 + displacement[:, 1]**2)
+        time_elapsed = (end_frames - start_frames) / self.frame_rate
+        speed_km_per_hour = distance_covered / time_elapsed * 3.6
+
+        # Running total of each track's distance, block by block in frame order
+        block_order = np.lexsort((start_frames, block_tracks))
+        block_tracks = block_tracks[block_order]
+        track_starts = np.flatnonzero(np.diff(block_tracks)) + 1
+        total_distance = np.concatenate(
+            [np.cumsum(group) for group in np.split(distance_covered[block_order], track_starts)]
+        ) if len(block_order) else np.array([])
+        block_keys = block_tracks * (num_frames + 1) + start_frames[block_order]
+        block_speed = speed_km_per_hour[block_order]
+
+        # Every row inherits the values of the block it falls in, up to (excluding) the block's last frame
+        row_block_start = frames - frames % self.frame_window
+        row_block_end = np.minimum(row_block_start + self.frame_window, num_frames - 1)
+        row_keys = track_ids * (num_frames + 1) + row_block_start
+        block_index = np.minimum(np.searchsorted(block_keys, row_keys), max(len(block_keys) - 1, 0))
+        in_block = (frames < row_block_end)
+        if len(block_keys):
+            in_block &= block_keys[block_index] == row_keys
+        else:
+            in_block[:] = False
+
+        table.speed[rows[in_block]] = block_speed[block_index[in_block]]
+        table.distance[rows[in_block]] = total_distance[block_index[in_block]]
+
+    def add_sliding_speed_and_distance_to_table(self, table):
+        """Vectorized SlidingWindowSpeedEstimator over the players of a TrackTable.
+
+        A row's speed is the displacement since the oldest position of its track
+        in the last frame_window frames. The distance grows from anchor to
+        anchor, each anchor being the track's first position at least
+        frame_window frames after the previous one, so the results are the
+        same as feeding the streaming estimator frame by frame.
+        """
+        num_frames = table.num_frames
+        rows = np.flatnonzero(table.object_mask('players'))
+        rows = rows[~np.isnan(table.position_transformed[rows, 0])]
+        if len(rows) == 0:
+            return
+
+        # Rows in (track id, frame) order, searched through one sorted key array
+        order = np.lexsort((table.frame[rows], table.track_id[rows]))
+        rows = rows[order]
+        frames = table.frame[rows].astype(np.int64)
+        track_ids = table.track_id[rows].astype(np.int64)
+        positions = table.position_transformed[rows].astype(np.float64)
+        keys = track_ids * (num_frames + 1) + frames
+        row_index = np.arange(len(keys))
+
+        # Oldest row of the same track still inside the window
+        window_start = track_ids * (num_frames + 1) + np.maximum(frames - self.frame_window, 0)
+        oldest = np.searchsorted(keys, window_start)
+        has_speed = oldest < row_index
+        displacement = positions[has_speed] - positions[oldest[has_speed]]
+        distance_covered = np.sqrt(displacement[:, 0]**2 + displacement[:, 1]**2)
+        time_elapsed = (frames[has_speed] - frames[oldest[has_speed]]) / self.frame_rate
+        speed_km_per_hour = distance_covered / time_elapsed * 3.6
+
+        # Anchors: every track's first row, then the first row frame_window frames after the last anchor.
+        # All tracks advance together, one anchor per step
+        track_starts = np.flatnonzero(np.concatenate(([True], np.diff(track_ids) != 0)))
+        track_ends = np.append(track_starts[1:], len(keys))
+        next_anchor = np.searchsorted(keys, keys + self.frame_window)
+        is_anchor = np.zeros(len(keys), dtype=bool)
+        current, current_ends = track_starts, track_ends
+        while len(current):
+            is_anchor[current] = True
+            current = next_anchor[current]
+            in_track = current < current_ends
+            current, current_ends = current[in_track], current_ends[in_track]
+
+        # Running distance over the anchors, restarting at each track
+        anchors = np.flatnonzero(is_anchor)
+        first_of_track = np.concatenate(([True], track_ids[anchors[1:]] != track_ids[anchors[:-1]]))
+        step = positions[anchors[1:]] - positions[anchors[:-1]]
+        segments = np.concatenate(([0.0], np.sqrt(step[:, 0]**2 + step[:, 1]**2)))
+        segments[first_of_track] = 0.0
+        total_distance = np.concatenate(
+            [np.cumsum(group) for group in np.split(segments, np.flatnonzero(first_of_track)[1:])])
+
+        # Every row carries the total as of its latest anchor
+        row_anchor = np.searchsorted(anchors, row_index, side='right') - 1
+
+        table.speed[rows[has_speed]] = speed_km_per_hour
+        table.distance[rows[has_speed]] = total_distance[row_anchor[has_speed]]
+
     def draw_speed_and_distance(self,frames,tracks):
         output_frames = []
         for frame_num, frame in enumerate(frames):
-            for object, object_tracks in tracks.items():
-                if object == "ball" or object == "referees":
-                    continue 
-                for _, track_info in object_tracks[frame_num].items():
-                   if "speed" in track_info:
-                       speed = track_info.get('speed',None)
-                       distance = track_info.get('distance',None)
-                       if speed is None or distance is None:
-                           continue
-                       
-                       bbox = track_info['bbox']
-                       position = get_foot_position(bbox)
-                       position = list(position)
-                       position[1]+=40
-
-                       position = tuple(map(int,position))
-                       cv2.putText(frame, f"{speed:.2f} km/h",position,cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,0),2)
-                       cv2.putText(frame, f"{distance:.2f} m",(position[0],position[1]+20),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,0),2)
+            frame = self.draw_frame_speed_and_distance(frame, frame_num, tracks)
             output_frames.append(frame)
         
-        return output_frames
\ No newline at end of file
+        return output_frames
+
+    def draw_frame_speed_and_distance(self, frame, frame_num, tracks):
+        for object, object_tracks in tracks.items():
+            if object == "ball" or object == "referees":
+                continue 
+            frame = self.draw_track_speeds(frame, object_tracks[frame_num])
+
+        return frame
+
+    def draw_track_speeds(self, frame, frame_tracks):
+        """Draw speed and distance under every track of one frame, in place"""
+        for _, track_info in frame_tracks.items():
+           if "speed" in track_info:
+               speed = track_info.get('speed',None)
+               distance = track_info.get('distance',None)
+               if speed is None or distance is None:
+                   continue
+               
+               bbox = track_info['bbox']
+               position = get_foot_position(bbox)
+               position = list(position)
+               position[1]+=40
+
+               position = tuple(map(int,position))
+               cv2.putText(frame, f"{speed:.2f} km/h",position,cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,0),2)
+               cv2.putText(frame, f"{distance:.2f} m",(position[0],position[1]+20),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,0),2)
+
+        return frame
\ No newline at end of file
@@ -1,9 +1,50 @@
-from sklearn.cluster import KMeans
+import numpy as np
+import cv2
 
 class TeamAssigner:
-    def __init__(self):
+    """Assigns players to teams by the colour of their jersey.
+
+    In the default 'fast' colour mode the top half of every player box in a
+    frame is resampled to a small fixed grid and split into jersey and
+    background with a 2-means run on all crops at once in NumPy (the
+    background cluster is the one holding most of the crop corners). The
+    'kmeans' mode keeps the original per-crop scikit-learn clustering.
+
+    The two team colours are learned while the video streams by: colours
+    sampled from the first frames initialise a 2-means model, which is then
+    updated online (mini-batch) with every new sample. Each player is sampled
+    every vote_interval frames, up to max_votes times, and its team is the
+    majority of its votes, so no frame has to be kept or decoded twice. The
+    vote interval is given in seconds and converted with the stream's fps.
+    """
+    def __init__(self, color_mode='fast', crop_size=16, iterations=5, min_samples=20,
+                 vote_interval_seconds=0.5, max_votes=15, min_learning_rate=0.01, frame_rate=24):
+        self.team_colors = {}
+        self.player_team_dict = {}
+        self.color_mode = color_mode
+        self.crop_size = crop_size
+        self.iterations = iterations
+
+        self.min_samples = min_samples
+        self.vote_interval_seconds = vote_interval_seconds
+        self.max_votes = max_votes
+        self.min_learning_rate = min_learning_rate
+        self.set_frame_rate(frame_rate)
+        self.reset()
+
+    def set_frame_rate(self, frame_rate):
+        # Same sampling period at any fps (12 frames at 24 fps)
+        self.frame_rate = frame_rate
+        self.vote_interval = max(1, int(round(self.vote_interval_seconds * frame_rate)))
+
+    def reset(self):
         self.team_colors = {}
         self.player_team_dict = {}
+        self.team_centers = None
+        self.center_counts = np.zeros(2)
+        self.player_votes = {}  # {player_id: [votes team 1, votes team 2]}
+        self.player_last_sample = {}  # {player_id: frame_num}
+        self.pending_samples = []  # (player_id, colour) seen before the model exists
     
     def get_clustering_model(self,image):
         # Reshape the image to 2D array
@@ -13,13 +54,14 @@ class TeamAssigner:
         if len(image_2d) == 0:
             return None
 
-        # Preform K-means with 2 clusters
+        # Preform K-means with 2 clusters; scikit-learn is only needed by the 'kmeans' colour mode
+        from sklearn.cluster import KMeans
         kmeans = KMeans(n_clusters=2, init="k-means++",n_init=1)
         kmeans.fit(image_2d)
 
         return kmeans
 
-    def get_player_color(self,frame,bbox):
+    def get_top_half_image(self, frame, bbox):
         image = frame[int(bbox[1]):int(bbox[3]),int(bbox[0]):int(bbox[2])]
 
         # Check if the cropped image is valid
@@ -32,6 +74,17 @@ class TeamAssigner:
         if top_half_image.shape[0] == 0 or top_half_image.shape[1] == 0:
             return None
 
+        return top_half_image
+
+    def get_player_color(self,frame,bbox):
+        if self.color_mode == 'fast':
+            player_color = self.get_player_colors(frame, [bbox])[0]
+            return None if np.isnan(player_color[0]) else player_color
+
+        top_half_image = self.get_top_half_image(frame, bbox)
+        if top_half_image is None:
+            return None
+
         # Get Clustering model
         kmeans = self.get_clustering_model(top_half_image)
 
@@ -54,46 +107,200 @@ class TeamAssigner:
 
         return player_color
 
+    def get_player_colors(self, frame, bboxes):
+        """Jersey colour of every box of a frame as an (n, 3) array; NaN rows for empty boxes"""
+        player_colors = np.full((len(bboxes), 3), np.nan)
+        if self.color_mode != 'fast':
+            for i, bbox in enumerate(bboxes):
+                player_color = self.get_player_color(frame, bbox)
+                if player_color is not None:
+                    player_colors[i] = player_color
+            return player_colors
+
+        size = self.crop_size
+        crops, valid = [], []
+        for i, bbox in enumerate(bboxes):
+            top_half_image = self.get_top_half_image(frame, bbox)
+            if top_half_image is not None:
+                crops.append(cv2.resize(top_half_image, (size, size), interpolation=cv2.INTER_NEAREST))
+                valid.append(i)
+        if not crops:
+            return player_colors
+
+        pixels = np.stack(crops).reshape(len(crops), size * size, 3).astype(np.float32)
+        corner_indices = [0, size - 1, (size - 1) * size, size * size - 1]
+
+        # 2-means per crop, all crops at once: the background centre starts at the
+        # corners' mean and the jersey centre at the pixel farthest from it
+        background = pixels[:, corner_indices].mean(axis=1)
+        farthest = np.linalg.norm(pixels - background[:, None], axis=2).argmax(axis=1)
+        centers = np.stack([background, pixels[np.arange(len(crops)), farthest]], axis=1)
+        for _ in range(self.iterations):
+            distances = np.linalg.norm(pixels[:, :, None] - centers[:, None], axis=3)
+            in_second = distances[:, :, 1] < distances[:, :, 0]
+            for cluster, members in enumerate((~in_second, in_second)):
+                counts = members.sum(axis=1)
+                sums = (pixels * members[:, :, None]).sum(axis=1)
+                has_members = counts > 0
+                centers[has_members, cluster] = sums[has_members] / counts[has_members, None]
+
+        # The background is the cluster holding most corners (ties go to the first)
+        corner_votes = in_second[:, corner_indices].sum(axis=1)
+        non_player_cluster = (corner_votes > 2).astype(int)
+        player_colors[valid] = centers[np.arange(len(crops)), 1 - non_player_cluster]
+
+        return player_colors
+
+    def fit_team_colors(self, player_colors):
+        """2-means over jersey colours; the first centre is team 1"""
+        player_colors = np.asarray(player_colors, dtype=np.float64)
+        first = player_colors[np.linalg.norm(player_colors - player_colors.mean(axis=0), axis=1).argmax()]
+        second = player_colors[np.linalg.norm(player_colors - first, axis=1).argmax()]
+        centers = np.stack([first, second])
+        for _ in range(10):
+            labels = np.linalg.norm(player_colors[:, None] - centers[None], axis=2).argmin(axis=1)
+            for team in range(2):
+                if (labels == team).any():
+                    centers[team] = player_colors[labels == team].mean(axis=0)
+
+        self.team_centers = centers
+        self.center_counts = np.bincount(labels, minlength=2).astype(np.float64)
+        self._update_team_colors()
+
+    def partial_fit(self, player_colors):
+        """Mini-batch update of the team centres with new colours"""
+        for player_color in player_colors:
+            team = np.linalg.norm(self.team_centers - player_color, axis=1).argmin()
+            self.center_counts[team] += 1
+            learning_rate = max(1 / self.center_counts[team], self.min_learning_rate)
+            self.team_centers[team] += learning_rate * (player_color - self.team_centers[team])
+        self._update_team_colors()
+
+    def _update_team_colors(self):
+        self.team_colors[1] = self.team_centers[0].copy()
+        self.team_colors[2] = self.team_centers[1].copy()
+
     def assign_team_color(self,frame, player_detections):
-        player_colors = []
-        for _, player_detection in player_detections.items():
-            bbox = player_detection["bbox"]
-            player_color = self.get_player_color(frame,bbox)
-            if player_color is not None:  # Only add valid colors
-                player_colors.append(player_color)
+        player_colors = self.get_player_colors(frame, [player_detection["bbox"] for player_detection in player_detections.values()])
+        player_colors = player_colors[~np.isnan(player_colors[:, 0])]
         
         # Check if we have enough valid player colors for clustering
         if len(player_colors) < 2:
             # Set default team colors if we don't have enough samples
             self.team_colors[1] = [255, 0, 0]  # Red
             self.team_colors[2] = [0, 0, 255]  # Blue
-            self.kmeans = None
+            self.team_centers = None
             return
-        
-        kmeans = KMeans(n_clusters=2, init="k-means++",n_init=10)
-        kmeans.fit(player_colors)
 
-        self.kmeans = kmeans
+        self.fit_team_colors(player_colors)
 
-        self.team_colors[1] = kmeans.cluster_centers_[0]
-        self.team_colors[2] = kmeans.cluster_centers_[1]
+    def predict_teams(self, player_colors):
+        """Team (1 or 2) of every colour with a single nearest-centre lookup; 1 when unknown"""
+        player_colors = np.asarray(player_colors, dtype=np.float64).reshape(-1, 3)
+        teams = np.ones(len(player_colors), dtype=int)
+        if self.team_centers is None:
+            return teams
+        valid = ~np.isnan(player_colors[:, 0])
+        distances = np.linalg.norm(player_colors[valid, None] - self.team_centers[None], axis=2)
+        teams[valid] = distances.argmin(axis=1) + 1
+        return teams
 
-    def get_player_team(self,frame,player_bbox,player_id):
-        if player_id in self.player_team_dict:
-            return self.player_team_dict[player_id]
+    def _vote(self, player_ids, teams):
+        for player_id, team_id in zip(player_ids, teams):
+            votes = self.player_votes.setdefault(player_id, np.zeros(2, dtype=int))
+            votes[team_id - 1] += 1
+            self.player_team_dict[player_id] = int(votes.argmax()) + 1
 
-        player_color = self.get_player_color(frame,player_bbox)
+    def due_players(self, frame_num, player_ids):
+        """Indices of the players that should be sampled in this frame"""
+        return [i for i, player_id in enumerate(player_ids)
+                if sum(self.player_votes.get(int(player_id), ())) < self.max_votes
+                and frame_num - self.player_last_sample.get(int(player_id), -self.vote_interval) >= self.vote_interval]
 
-        # If we don't have valid color or clustering model, assign default team
-        if player_color is None or self.kmeans is None:
-            team_id = 1  # Default team
-        else:
-            team_id = self.kmeans.predict(player_color.reshape(1,-1))[0]
-            team_id += 1
+    def observe(self, frame, frame_num, player_bboxes, player_ids):
+        """Sample the players of a frame that are due for a vote"""
+        due = self.due_players(frame_num, player_ids)
+        if due:
+            player_colors = self.get_player_colors(frame, [player_bboxes[i] for i in due])
+            self.add_samples(frame_num, [player_ids[i] for i in due], player_colors)
 
-        if player_id == 91:
-            team_id = 1
+    def add_samples(self, frame_num, player_ids, player_colors):
+        """Vote with jersey colours already extracted, e.g. while tracking"""
+        player_colors = np.asarray(player_colors, dtype=np.float64).reshape(-1, 3)
+        valid = ~np.isnan(player_colors[:, 0])
+        sampled_ids = [int(player_id) for player_id, is_valid in zip(player_ids, valid) if is_valid]
+        player_colors = player_colors[valid]
+        if not sampled_ids:
+            return
+        for player_id in sampled_ids:
+            self.player_last_sample[player_id] = frame_num
 
-        self.player_team_dict[player_id] = team_id
+        if self.team_centers is None:
+            self.pending_samples += list(zip(sampled_ids, player_colors))
+            if len(self.pending_samples) >= self.min_samples:
+                self.finalize()
+            return
 
-        return team_id
\ No newline at end of file
+        self.partial_fit(player_colors)
+        self._vote(sampled_ids, self.predict_teams(player_colors))
+
+    def finalize(self):
+        """Build the model from the samples gathered so far, if it does not exist yet"""
+        if self.team_centers is not None or not self.pending_samples:
+            return
+        player_ids = [player_id for player_id, _ in self.pending_samples]
+        player_colors = np.array([player_color for _, player_color in self.pending_samples])
+        if len(player_colors) < 2:
+            return
+        self.pending_samples = []
+        self.fit_team_colors(player_colors)
+        self._vote(player_ids, self.predict_teams(player_colors))
+
+    def get_params(self):
+        """Settings that change the assignment"""
+        return {
+            'color_mode': self.color_mode,
+            'crop_size': self.crop_size,
+            'min_samples': self.min_samples,
+            'vote_interval': self.vote_interval,
+            'max_votes': self.max_votes,
+        }
+
+    def get_state(self):
+        """Compact model and votes, without any image data, for caching"""
+        return {
+            'team_centers': self.team_centers,
+            'center_counts': self.center_counts,
+            'team_colors': self.team_colors,
+            'player_votes': self.player_votes,
+            'player_team_dict': self.player_team_dict,
+        }
+
+    def load_state(self, state):
+        self.team_centers = state['team_centers']
+        self.center_counts = state['center_counts']
+        self.team_colors = state['team_colors']
+        self.player_votes = state['player_votes']
+        self.player_team_dict = state['player_team_dict']
+
+    def get_teams(self, player_ids):
+        """Majority team of every player id; 1 for players never sampled"""
+        player_ids = np.asarray(player_ids)
+        unique_ids, inverse = np.unique(player_ids, return_inverse=True)
+        unique_teams = np.array([self.player_team_dict.get(int(player_id), 1) for player_id in unique_ids], dtype=int)
+        return unique_teams[inverse]
+
+    def get_player_teams(self, frame, player_bboxes, player_ids):
+        """Teams of all players of a frame; colours are only extracted for players not seen before"""
+        player_ids = [int(player_id) for player_id in player_ids]
+        new = [i for i, player_id in enumerate(player_ids) if player_id not in self.player_team_dict]
+        if new:
+            player_colors = self.get_player_colors(frame, [player_bboxes[i] for i in new])
+            valid = ~np.isnan(player_colors[:, 0])
+            if self.team_centers is None and valid.sum() >= 2:
+                self.fit_team_colors(player_colors[valid])
+            self._vote([player_ids[i] for i in new], self.predict_teams(player_colors))
+        return [self.player_team_dict[player_id] for player_id in player_ids]
+
+    def get_player_team(self,frame,player_bbox,player_id):
+        return self.get_player_teams(frame, [player_bbox], [player_id])[0]
@@ -0,0 +1 @@
+from .track_cache import TrackCache
\ No newline at end of file
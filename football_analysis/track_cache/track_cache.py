@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+
+# Bump when the layout of cached values changes so old entries are ignored
+CACHE_VERSION = 2
+
+class TrackCache:
+    """Disk cache for expensive per-video stages (tracks, camera movement, ...).
+
+    Entries are keyed by a hash of the video content, the model weights and the
+    stage parameters, so a different video, model or setting never reuses a
+    stale result. The cache is bounded by max_size_bytes and evicts the least
+    recently used entries first.
+    """
+    def __init__(self, cache_dir='stubs/cache', max_size_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    index = json.load(f)
+                if index.get('version') == CACHE_VERSION:
+                    return index
+            except (OSError, ValueError):
+                pass
+        return {'version': CACHE_VERSION, 'entries': {}, 'fingerprints': {}}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def file_fingerprint(self, path):
+        """Content hash of a file, memoized by path, size and modification time"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self.index['fingerprints'].get(path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['digest']
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(8 * 1024 * 1024), b''):
+                digest.update(chunk)
+        return self.add_fingerprint(path, digest.hexdigest())
+
+    def add_fingerprint(self, path, digest):
+        """Remember a content hash computed elsewhere (16-byte BLAKE2b hex, as file_fingerprint)"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        self.index['fingerprints'][path] = {'size': stat.st_size,
+                                            'mtime_ns': stat.st_mtime_ns,
+                                            'digest': digest}
+        self._save_index()
+        return digest
+
+    def make_key(self, stage, video_path, model_path=None, params=None):
+        key_data = {
+            'version': CACHE_VERSION,
+            'stage': stage,
+            'video': self.file_fingerprint(video_path),
+            'model': self.file_fingerprint(model_path) if model_path is not None else None,
+            'params': params or {},
+        }
+        key_json = json.dumps(key_data, sort_keys=True, default=str)
+        return f"{stage}-{hashlib.blake2b(key_json.encode(), digest_size=16).hexdigest()}"
+
+    def get(self, key):
+        entry = self.index['entries'].get(key)
+        entry_path = self._entry_path(key)
+        if entry is None or not os.path.exists(entry_path):
+            return None
+
+        try:
+            with open(entry_path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.invalidate(key)
+            return None
+
+        entry['last_access'] = time.time()
+        self._save_index()
+        return value
+
+    def put(self, key, value):
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+        self.index['entries'][key] = {'size': os.path.getsize(entry_path),
+                                      'last_access': time.time()}
+        self._evict()
+        self._save_index()
+
+    def invalidate(self, key):
+        self.index['entries'].pop(key, None)
+        if os.path.exists(self._entry_path(key)):
+            os.remove(self._entry_path(key))
+        self._save_index()
+
+    def _evict(self):
+        entries = self.index['entries']
+        total_size = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_access']):
+            if total_size <= self.max_size_bytes:
+                break
+            total_size -= entries[key]['size']
+            del entries[key]
+            if os.path.exists(self._entry_path(key)):
+                os.remove(self._entry_path(key))
@@ -1 +1,3 @@
-from .tracker import Tracker
\ No newline at end of file
+from .tracker import Tracker
+from .track_table import TrackTable
+from .detection_engine import DetectionEngine
\ No newline at end of file
@@ -0,0 +1,69 @@
+import numpy as np
+import cv2
+
+class AppearanceCache:
+    """Jersey appearance of every stable player ID, for re-identification.
+
+    The appearance is a normalized hue/saturation histogram of the top half of
+    the player box. Each stable ID keeps an exponential moving average of it,
+    refreshed only every refresh_seconds (converted to frames with the
+    stream's fps), so tracks that never break cost one small histogram now
+    and then rather than one per frame.
+    """
+    def __init__(self, bins=(16, 8), momentum=0.8, refresh_seconds=10/24, frame_rate=24):
+        self.bins = list(bins)
+        self.momentum = momentum
+        self.refresh_seconds = refresh_seconds
+        self.set_frame_rate(frame_rate)
+        self.reset()
+
+    def set_frame_rate(self, frame_rate):
+        self.refresh_interval = max(1, int(round(self.refresh_seconds * frame_rate)))
+
+    def reset(self):
+        self.embeddings = {}  # {stable_id: histogram}
+        self.last_update = {}  # {stable_id: frame_num}
+
+    def extract(self, frame, bbox):
+        """Histogram of the jersey crop, or None when the box is empty"""
+        height, width = frame.shape[:2]
+        x1, y1 = max(int(bbox[0]), 0), max(int(bbox[1]), 0)
+        x2, y2 = min(int(bbox[2]), width), min(int(bbox[3]), height)
+        top_half_image = frame[y1:y1 + (y2 - y1) // 2, x1:x2]
+        if top_half_image.shape[0] == 0 or top_half_image.shape[1] == 0:
+            return None
+
+        hsv = cv2.cvtColor(top_half_image, cv2.COLOR_BGR2HSV)
+        histogram = cv2.calcHist([hsv], [0, 1], None, self.bins, [0, 180, 0, 256]).ravel()
+        total = histogram.sum()
+        return histogram / total if total > 0 else None
+
+    def needs_update(self, stable_id, frame_num):
+        last_update = self.last_update.get(stable_id)
+        return last_update is None or frame_num - last_update >= self.refresh_interval
+
+    def update(self, stable_id, embedding, frame_num):
+        if embedding is None:
+            return
+        if stable_id in self.embeddings:
+            embedding = self.momentum * self.embeddings[stable_id] + (1 - self.momentum) * embedding
+        self.embeddings[stable_id] = embedding
+        self.last_update[stable_id] = frame_num
+
+    def forget(self, stable_id):
+        self.embeddings.pop(stable_id, None)
+        self.last_update.pop(stable_id, None)
+
+    def distances(self, embeddings, stable_ids):
+        """Hellinger distances in [0, 1] between embeddings and the cached stable IDs; NaN when unknown"""
+        distances = np.full((len(embeddings), len(stable_ids)), np.nan)
+        rows = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        columns = [j for j, stable_id in enumerate(stable_ids) if stable_id in self.embeddings]
+        if not rows or not columns:
+            return distances
+
+        query = np.sqrt(np.array([embeddings[i] for i in rows]))
+        cached = np.sqrt(np.array([self.embeddings[stable_ids[j]] for j in columns]))
+        similarity = np.clip(query @ cached.T, 0, 1)
+        distances[np.ix_(rows, columns)] = np.sqrt(1 - similarity)
+        return distances
@@ -0,0 +1,119 @@
+from ultralytics import YOLO
+import supervision as sv
+import os
+import shutil
+
+# Rough working set of one frame in a batch: the decoded frame, the letterboxed
+# input tensor and the network activations (a multiple of the input tensor)
+ACTIVATION_FACTOR = 20
+DEFAULT_FRAME_SIZE = (1920, 1080)
+
+EXPORT_FORMATS = {
+    'onnx': '.onnx',
+    'openvino': '_openvino_model',
+}
+
+class DetectionEngine:
+    """YOLO inference tuned for throughput and bounded memory.
+
+    Frames are predicted in batches whose size is derived from the memory
+    available on the machine, at a configurable input size; batches_in_flight
+    is how many decoded batches the caller may hold at once (e.g. queued in a
+    StagedPipeline), and the memory budget is shared between them. The model
+    can be exported once to ONNX Runtime (optionally fp16) or OpenVINO
+    (optionally fp16 or INT8) for faster CPU inference. Ultralytics results, which keep a copy of the
+    original image, are reduced to sv.Detections right after each batch.
+    """
+    def __init__(self, model_path, conf=0.1, imgsz=640, half=False, int8=False,
+                 backend='pytorch', batch_size=None, max_batch_size=64,
+                 memory_fraction=0.25, frame_size=DEFAULT_FRAME_SIZE, batches_in_flight=1):
+        self.conf = conf
+        self.imgsz = imgsz
+        self.half = half
+        self.int8 = int8
+        self.backend = backend
+        if int8 and backend != 'openvino':
+            raise ValueError(f"INT8 inference is only supported with the openvino backend, not {backend}")
+
+        if backend != 'pytorch':
+            model_path = self.export_model(model_path, backend, imgsz=imgsz, half=half, int8=int8)
+        self.model = YOLO(model_path, task='detect')
+
+        # Class names are the same for every result, keep them once
+        self.names = dict(self.model.names)
+        self.names_inv = {v:k for k,v in self.names.items()}
+
+        self.max_batch_size = max_batch_size
+        self.memory_fraction = memory_fraction
+        self.batches_in_flight = batches_in_flight
+        self.batch_size = batch_size or self.auto_batch_size(frame_size)
+
+    @staticmethod
+    def export_model(model_path, backend, imgsz=640, half=False, int8=False):
+        """Export the weights to an inference backend, reusing a previous export when it is up to date"""
+        if backend not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        if int8 and backend != 'openvino':
+            # Ultralytics ignores int8 for ONNX and would silently export fp32
+            raise ValueError(f"INT8 export is only supported for the openvino backend, not {backend}")
+
+        precision = 'int8' if int8 else 'fp16' if half else 'fp32'
+        stem = os.path.splitext(model_path)[0]
+        export_path = f"{stem}_{imgsz}_{precision}{EXPORT_FORMATS[backend]}"
+        if os.path.exists(export_path) and os.path.getmtime(export_path) >= os.path.getmtime(model_path):
+            return export_path
+
+        exported_path = YOLO(model_path).export(format=backend, imgsz=imgsz, half=half, int8=int8)
+        if os.path.exists(export_path):
+            if os.path.isdir(export_path):
+                shutil.rmtree(export_path)
+            else:
+                os.remove(export_path)
+        os.replace(exported_path, export_path)
+        return export_path
+
+    @staticmethod
+    def available_memory_bytes():
+        try:
+            import psutil
+            return psutil.virtual_memory().available
+        except ImportError:
+            pass
+        try:
+            return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    def auto_batch_size(self, frame_size=DEFAULT_FRAME_SIZE):
+        """Largest batch whose working set fits in a fraction of the available memory.
+
+        Decoded frames are counted once per batch in flight; the input tensor
+        and activations only for the batch being predicted.
+        """
+        available = self.available_memory_bytes()
+        if available is None:
+            return 20
+
+        frame_bytes = frame_size[0] * frame_size[1] * 3
+        input_bytes = self.imgsz * self.imgsz * 3 * (2 if self.half else 4)
+        per_frame_bytes = frame_bytes * self.batches_in_flight + input_bytes * (1 + ACTIVATION_FACTOR)
+
+        batch_size = int(available * self.memory_fraction // per_frame_bytes)
+        return max(1, min(batch_size, self.max_batch_size))
+
+    def get_cache_params(self):
+        """Settings that change the detections"""
+        return {
+            'conf': self.conf,
+            'imgsz': self.imgsz,
+            'half': self.half,
+            'int8': self.int8,
+            'backend': self.backend,
+        }
+
+    def predict(self, frames):
+        """sv.Detections for each frame of a batch"""
+        results = self.model.predict(frames, conf=self.conf, imgsz=self.imgsz, half=self.half, verbose=False)
+        detections = [sv.Detections.from_ultralytics(result) for result in results]
+        del results
+        return detections
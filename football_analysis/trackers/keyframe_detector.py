@@ -0,0 +1,197 @@
+import supervision as sv
+import numpy as np
+import cv2
+import sys 
+sys.path.append('../')
+from utils import downscale_gray
+
+class KeyframeDetector:
+    """Runs YOLO on keyframes only and propagates the boxes in between.
+
+    A frame is a keyframe every `stride` frames, when the scene changed too much
+    since the last keyframe (mean absolute difference of downscaled gray frames)
+    or when optical flow can no longer follow the boxes. Other frames reuse the
+    previous boxes shifted by the median Lucas-Kanade flow of a grid of points
+    inside each box, and ByteTrack keeps the IDs going as usual.
+    """
+    def __init__(self, engine, stride=5, adaptive=True, motion_threshold=12.0,
+                 min_tracked_fraction=0.5, downscale=0.5, grid_size=3):
+        self.engine = engine
+        self.stride = stride
+        self.adaptive = adaptive
+        self.motion_threshold = motion_threshold
+        self.min_tracked_fraction = min_tracked_fraction
+        self.downscale = downscale
+        self.grid_size = grid_size
+
+        self.lk_params = dict(
+            winSize = (15,15),
+            maxLevel = 2,
+            criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT,10,0.03)
+        )
+
+        self.reset()
+
+    def reset(self):
+        self.frames_since_keyframe = None
+        self.keyframe_gray = None
+        self.previous_gray = None
+        self.previous_detections = None
+        self.num_frames = 0
+        self.num_keyframes = 0
+
+    def get_cache_params(self):
+        return {
+            'stride': self.stride,
+            'adaptive': self.adaptive,
+            'motion_threshold': self.motion_threshold,
+            'min_tracked_fraction': self.min_tracked_fraction,
+            'downscale': self.downscale,
+            'grid_size': self.grid_size,
+        }
+
+    def _gray(self, frame):
+        return downscale_gray(frame, self.downscale)
+
+    def _scene_changed(self, gray, keyframe_gray):
+        if not self.adaptive or keyframe_gray is None:
+            return False
+        return cv2.absdiff(gray, keyframe_gray).mean() > self.motion_threshold
+
+    def _schedule_keyframes(self, grays):
+        # Stride and scene changes only depend on the frames, so the keyframes are
+        # known up front until a flow fallback forces one and the rest is rescheduled
+        is_keyframe = []
+        frames_since_keyframe = self.frames_since_keyframe
+        keyframe_gray = self.keyframe_gray
+        for gray in grays:
+            if (frames_since_keyframe is None or frames_since_keyframe + 1 >= self.stride
+                    or self._scene_changed(gray, keyframe_gray)):
+                frames_since_keyframe = 0
+                keyframe_gray = gray
+                is_keyframe.append(True)
+            else:
+                frames_since_keyframe += 1
+                is_keyframe.append(False)
+        return is_keyframe
+
+    def _mark_keyframe(self, gray):
+        self.frames_since_keyframe = 0
+        self.keyframe_gray = gray
+        self.num_keyframes += 1
+
+    def detect(self, frames, grays=None):
+        """sv.Detections for each frame, detected on keyframes and propagated elsewhere.
+
+        grays can pass grayscale frames already downscaled by self.downscale.
+        Consecutive keyframes are detected in one batch. A keyframe after a
+        propagated frame is only detected when it is reached, because a flow
+        fallback on the way forces a keyframe and reschedules the rest of the
+        batch from it, and an earlier prediction would then be wasted.
+        """
+        if grays is None:
+            grays = [self._gray(frame) for frame in frames]
+        is_keyframe = self._schedule_keyframes(grays)
+
+        keyframe_detections = {}
+        detections = []
+        for i, gray in enumerate(grays):
+            if is_keyframe[i]:
+                if i not in keyframe_detections:
+                    run_end = i
+                    while run_end < len(grays) and is_keyframe[run_end]:
+                        run_end += 1
+                    predictions = self.engine.predict([frames[j] for j in range(i, run_end)])
+                    keyframe_detections.update(zip(range(i, run_end), predictions))
+                frame_detections = keyframe_detections.pop(i)
+                self._mark_keyframe(gray)
+            else:
+                frame_detections = self.propagate(gray)
+                if frame_detections is None:
+                    # Flow lost the boxes: fall back to the detector for this frame
+                    # and count the stride from it for the rest of the batch
+                    frame_detections = self.engine.predict([frames[i]])[0]
+                    self._mark_keyframe(gray)
+                    is_keyframe[i + 1:] = self._schedule_keyframes(grays[i + 1:])
+                else:
+                    self.frames_since_keyframe += 1
+
+            self.previous_gray = gray
+            self.previous_detections = frame_detections
+            detections.append(frame_detections)
+
+        self.num_frames += len(frames)
+        return detections
+
+    def propagate(self, gray):
+        """Previous boxes moved by the optical flow to this frame, or None if they cannot be followed"""
+        detections = self.previous_detections
+        if len(detections) == 0:
+            return detections
+
+        # A grid of points inside every box, tracked in one call
+        num_boxes = len(detections)
+        xyxy = detections.xyxy * self.downscale
+        grid = (np.arange(self.grid_size) + 0.5) / self.grid_size
+        grid_x, grid_y = [g.ravel() for g in np.meshgrid(grid, grid)]
+        widths = xyxy[:,2] - xyxy[:,0]
+        heights = xyxy[:,3] - xyxy[:,1]
+        points = np.stack([xyxy[:,0,None] + widths[:,None] * grid_x,
+                           xyxy[:,1,None] + heights[:,None] * grid_y], axis=-1)
+        points = points.reshape(-1, 1, 2).astype(np.float32)
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.previous_gray, gray, points, None, **self.lk_params)
+        status = status.reshape(num_boxes, -1).astype(bool)
+        if status.mean() < self.min_tracked_fraction:
+            return None
+
+        flow = (new_points - points).reshape(num_boxes, -1, 2)
+        flow[~status] = np.nan
+        shift = np.zeros((num_boxes, 2), dtype=np.float32)
+        tracked = status.any(axis=1)
+        shift[tracked] = np.nanmedian(flow[tracked], axis=1)
+        shift /= self.downscale
+
+        return sv.Detections(
+            xyxy=detections.xyxy + np.tile(shift, 2),
+            confidence=detections.confidence,
+            class_id=detections.class_id.copy(),
+            data=detections.data,
+        )
+
+    def keyframe_ratio(self):
+        return self.num_keyframes / self.num_frames if self.num_frames else 0.0
+
+def compare_detections(reference, candidate, names, iou_threshold=0.5):
+    """Per-class recall and mean IoU of candidate detections against reference ones, frame by frame"""
+    stats = {}
+    for reference_detections, candidate_detections in zip(reference, candidate):
+        for class_id in np.unique(reference_detections.class_id):
+            reference_boxes = reference_detections.xyxy[reference_detections.class_id == class_id]
+            candidate_boxes = candidate_detections.xyxy[candidate_detections.class_id == class_id]
+            class_stats = stats.setdefault(names[int(class_id)], {'reference': 0, 'matched': 0, 'iou_sum': 0.0})
+            class_stats['reference'] += len(reference_boxes)
+            if len(candidate_boxes) == 0:
+                continue
+
+            # Greedy one-to-one matching by decreasing IoU
+            iou = sv.box_iou_batch(reference_boxes, candidate_boxes)
+            used_reference, used_candidate = set(), set()
+            for flat_index in np.argsort(-iou, axis=None):
+                reference_index, candidate_index = np.unravel_index(flat_index, iou.shape)
+                if iou[reference_index, candidate_index] < iou_threshold:
+                    break
+                if reference_index in used_reference or candidate_index in used_candidate:
+                    continue
+                used_reference.add(reference_index)
+                used_candidate.add(candidate_index)
+                class_stats['matched'] += 1
+                class_stats['iou_sum'] += float(iou[reference_index, candidate_index])
+
+    return {
+        name: {
+            'recall': class_stats['matched'] / class_stats['reference'] if class_stats['reference'] else 0.0,
+            'mean_iou': class_stats['iou_sum'] / class_stats['matched'] if class_stats['matched'] else 0.0,
+        }
+        for name, class_stats in stats.items()
+    }
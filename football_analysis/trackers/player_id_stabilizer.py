@@ -0,0 +1,190 @@
+from scipy.optimize import linear_sum_assignment
+from collections import deque
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import get_center_of_bbox
+from .appearance_cache import AppearanceCache
+
+class PlayerIdStabilizer:
+    """Keeps player IDs consistent when ByteTrack loses and re-creates tracks.
+
+    History is kept per stable ID (last positions in a fixed-size ring buffer
+    and the last frame seen). A new track ID is linked to a recently lost
+    stable ID near its position: candidates come from a uniform grid over the
+    last known positions, and all new tracks of a frame are matched at once
+    with the Hungarian algorithm. A stable ID is never given to two tracks in
+    the same frame.
+
+    When the frame is given, jersey appearance joins the matching cost: lost
+    players are searched in a wider radius, and a candidate whose appearance
+    differs too much is never re-linked.
+    """
+    def __init__(self, max_distance_threshold=100, max_frames_missing=30, history_size=10,
+                 appearance_weight=0.5, max_appearance_distance=0.5, reid_radius_factor=2):
+        self.max_distance_threshold = max_distance_threshold  # pixels - adjust based on video resolution
+        self.max_frames_missing = max_frames_missing  # frames before considering player truly gone
+        self.history_size = history_size
+        self.appearance_weight = appearance_weight
+        self.max_appearance_distance = max_appearance_distance
+        self.reid_radius_factor = reid_radius_factor
+        self.appearance = AppearanceCache()
+        self.reset()
+
+    def reset(self):
+        self.history = {}  # {stable_id: {'positions': deque, 'last_seen': frame_num}}
+        self.id_mapping = {}  # {track_id: stable_id}
+        self.track_ids_by_stable_id = {}  # {stable_id: {track_id, ...}}
+        self.next_stable_id = 1
+
+        # Grid over last known positions, with cells as large as the match radius
+        self.grid = {}  # {cell: {stable_id, ...}}
+        self.cell_of_stable_id = {}
+        self.cell_size = None
+
+        self.appearance.reset()
+
+    def get_cache_params(self):
+        return {
+            'max_distance_threshold': self.max_distance_threshold,
+            'max_frames_missing': self.max_frames_missing,
+            'appearance_weight': self.appearance_weight,
+            'max_appearance_distance': self.max_appearance_distance,
+            'reid_radius_factor': self.reid_radius_factor,
+            'appearance_refresh_interval': self.appearance.refresh_interval,
+        }
+
+    def set_frame_rate(self, frame_rate):
+        self.appearance.set_frame_rate(frame_rate)
+
+    def _cell(self, position):
+        return (int(position[0] // self.cell_size), int(position[1] // self.cell_size))
+
+    def _move_in_grid(self, stable_id, position):
+        cell = self._cell(position)
+        old_cell = self.cell_of_stable_id.get(stable_id)
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            self.grid[old_cell].discard(stable_id)
+        self.grid.setdefault(cell, set()).add(stable_id)
+        self.cell_of_stable_id[stable_id] = cell
+
+    def _forget(self, stable_id):
+        del self.history[stable_id]
+        for track_id in self.track_ids_by_stable_id.pop(stable_id, ()):
+            del self.id_mapping[track_id]
+        cell = self.cell_of_stable_id.pop(stable_id, None)
+        if cell is not None:
+            self.grid[cell].discard(stable_id)
+        self.appearance.forget(stable_id)
+
+    def _link(self, track_id, stable_id):
+        self.id_mapping[track_id] = stable_id
+        self.track_ids_by_stable_id.setdefault(stable_id, set()).add(track_id)
+
+    def _unlink(self, track_id):
+        stable_id = self.id_mapping.pop(track_id)
+        self.track_ids_by_stable_id[stable_id].discard(track_id)
+
+    def _nearby_stable_ids(self, position, claimed, radius_cells=1):
+        cell_x, cell_y = self._cell(position)
+        for dx in range(-radius_cells, radius_cells + 1):
+            for dy in range(-radius_cells, radius_cells + 1):
+                for stable_id in self.grid.get((cell_x + dx, cell_y + dy), ()):
+                    if stable_id not in claimed:
+                        yield stable_id
+
+    def update(self, detections, frame_num, frame=None):
+        """{stable_id: detection} for one frame of {track_id: detection}"""
+        # The grid follows the threshold, which can be reconfigured before a run
+        if self.cell_size != self.max_distance_threshold:
+            self.cell_size = self.max_distance_threshold
+            self.grid, self.cell_of_stable_id = {}, {}
+            for stable_id, history in self.history.items():
+                self._move_in_grid(stable_id, history['positions'][-1])
+
+        # Forget players that have been missing too long
+        expired = [stable_id for stable_id, history in self.history.items()
+                   if frame_num - history['last_seen'] > self.max_frames_missing]
+        for stable_id in expired:
+            self._forget(stable_id)
+
+        centers = {track_id: get_center_of_bbox(detection['bbox'])
+                   for track_id, detection in detections.items() if 'bbox' in detection}
+
+        # Tracks that already have a stable ID keep it, unless another track claimed it first
+        assigned = {}
+        claimed = set()
+        new_track_ids = []
+        for track_id in centers:
+            stable_id = self.id_mapping.get(track_id)
+            if stable_id is not None and stable_id not in claimed:
+                assigned[track_id] = stable_id
+                claimed.add(stable_id)
+            else:
+                if stable_id is not None:
+                    self._unlink(track_id)
+                new_track_ids.append(track_id)
+
+        # Match new tracks to nearby lost players all at once
+        embeddings = {}
+        if new_track_ids:
+            use_appearance = frame is not None
+            radius_cells = self.reid_radius_factor if use_appearance else 1
+            max_distance = self.max_distance_threshold * radius_cells
+            candidates = sorted({stable_id for track_id in new_track_ids
+                                 for stable_id in self._nearby_stable_ids(centers[track_id], claimed, radius_cells)})
+            if candidates:
+                new_positions = np.array([centers[track_id] for track_id in new_track_ids], dtype=np.float64)
+                last_positions = np.array([self.history[stable_id]['positions'][-1] for stable_id in candidates],
+                                          dtype=np.float64)
+                distances = np.hypot(new_positions[:, None, 0] - last_positions[None, :, 0],
+                                     new_positions[:, None, 1] - last_positions[None, :, 1])
+                too_far = distances >= max_distance
+                costs = distances / max_distance
+
+                if use_appearance:
+                    embeddings = {track_id: self.appearance.extract(frame, detections[track_id]['bbox'])
+                                  for track_id in new_track_ids}
+                    appearance_distances = self.appearance.distances([embeddings[track_id] for track_id in new_track_ids],
+                                                                     candidates)
+                    known = ~np.isnan(appearance_distances)
+                    # Far candidates are only re-linked when their appearance is known and close
+                    too_far |= known & (appearance_distances > self.max_appearance_distance)
+                    too_far |= ~known & (distances >= self.max_distance_threshold)
+                    costs = np.where(known,
+                                     (1 - self.appearance_weight) * costs + self.appearance_weight * appearance_distances,
+                                     costs)
+
+                costs = np.where(too_far, 1e3, costs)
+                for row, column in zip(*linear_sum_assignment(costs)):
+                    if not too_far[row, column]:
+                        assigned[new_track_ids[row]] = candidates[column]
+                        claimed.add(candidates[column])
+                        self._link(new_track_ids[row], candidates[column])
+
+            # Unmatched tracks are new players
+            for track_id in new_track_ids:
+                if track_id not in assigned:
+                    stable_id = self.next_stable_id
+                    self.next_stable_id += 1
+                    self.history[stable_id] = {'positions': deque(maxlen=self.history_size), 'last_seen': frame_num}
+                    assigned[track_id] = stable_id
+                    self._link(track_id, stable_id)
+
+        stabilized_detections = {}
+        for track_id in centers:
+            stable_id = assigned[track_id]
+            history = self.history[stable_id]
+            history['positions'].append(centers[track_id])
+            history['last_seen'] = frame_num
+            self._move_in_grid(stable_id, centers[track_id])
+            if frame is not None and self.appearance.needs_update(stable_id, frame_num):
+                embedding = embeddings.get(track_id)
+                if embedding is None:
+                    embedding = self.appearance.extract(frame, detections[track_id]['bbox'])
+                self.appearance.update(stable_id, embedding, frame_num)
+            stabilized_detections[stable_id] = detections[track_id].copy()
+
+        return stabilized_detections
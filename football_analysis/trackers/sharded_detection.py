@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import supervision as sv
+import numpy as np
+import sys 
+sys.path.append('../')
+from utils import iter_video_frames, iter_frame_batches
+
+# Tracker of the current worker process, built once by the pool initializer
+_worker_tracker = None
+
+def _init_worker(tracker_params, batch_size, threads_per_worker):
+    global _worker_tracker
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    from .tracker import Tracker
+    _worker_tracker = Tracker(**tracker_params, batch_size=batch_size)
+
+def _track_shard(video_path, start_frame, end_frame):
+    tracker = _worker_tracker
+    tracker.reset_tracking_state()
+    raw_frames = []
+    for frame_batch in iter_frame_batches(iter_video_frames(video_path, start_frame, end_frame), tracker.batch_size):
+        for frame, detection in zip(frame_batch, tracker.detect_frames(frame_batch)):
+            raw_frame = tracker.track_detections(detection)
+            # Only compact colours leave the worker, never the frames
+            raw_frame["player_colors"] = tracker.sample_raw_player_colors(raw_frame, frame, len(raw_frames))
+            raw_frames.append(raw_frame)
+    return raw_frames
+
+def make_shards(num_frames, num_shards, overlap_frames, open_end=False):
+    """(read_start, start, end) per shard; frames [read_start, start) overlap the previous shard.
+
+    With open_end the last shard's end is None: num_frames is only the
+    container's estimate, and that shard reads until the decoder runs out.
+    """
+    bounds = np.linspace(0, num_frames, num_shards + 1).astype(int)
+    shards = [(int(max(0, start - overlap_frames)) if i > 0 else 0, int(start), int(end))
+              for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])) if end > start]
+    if open_end:
+        if shards:
+            read_start, start, _ = shards[-1]
+            shards[-1] = (read_start, start, None)
+        else:
+            shards = [(0, 0, None)]
+    return shards
+
+def match_track_ids(previous_frames, current_frames, iou_threshold=0.5):
+    """{current_id: previous_id} for tracks that cover the same boxes over the overlapping frames"""
+    votes = {}
+    for previous, current in zip(previous_frames, current_frames):
+        if not previous or not current:
+            continue
+        previous_ids = list(previous.keys())
+        current_ids = list(current.keys())
+        iou = sv.box_iou_batch(np.array([current[i]['bbox'] for i in current_ids]),
+                               np.array([previous[i]['bbox'] for i in previous_ids]))
+        best = iou.argmax(axis=1)
+        for row, column in enumerate(best):
+            if iou[row, column] >= iou_threshold:
+                key = (current_ids[row], previous_ids[column])
+                votes[key] = votes.get(key, 0) + 1
+
+    # One-to-one, most frames in agreement first
+    id_map, used = {}, set()
+    for (current_id, previous_id), _ in sorted(votes.items(), key=lambda item: -item[1]):
+        if current_id in id_map or previous_id in used:
+            continue
+        id_map[current_id] = previous_id
+        used.add(previous_id)
+    return id_map
+
+def stitch_shards(shards, shard_frames, object_names=("players", "referees")):
+    """Concatenate the raw frames of every shard with track IDs made consistent across shards"""
+    raw_frames = []
+    next_ids = {object_name: 1 for object_name in object_names}
+    for (read_start, start, end), frames in zip(shards, shard_frames):
+        overlap = start - read_start
+        id_maps = {}
+        for object_name in object_names:
+            id_map = match_track_ids([frame[object_name] for frame in raw_frames[read_start:start]],
+                                     [frame[object_name] for frame in frames[:overlap]])
+            # Tracks that started in this shard get fresh IDs
+            for frame in frames[overlap:]:
+                for track_id in frame[object_name]:
+                    if track_id not in id_map:
+                        id_map[track_id] = next_ids[object_name]
+                        next_ids[object_name] += 1
+            id_maps[object_name] = id_map
+
+        for frame in frames[overlap:]:
+            stitched_frame = dict(frame)
+            for object_name in object_names:
+                stitched_frame[object_name] = {id_maps[object_name][track_id]: info
+                                               for track_id, info in frame[object_name].items()}
+            if "player_colors" in frame:
+                stitched_frame["player_colors"] = {id_maps["players"][track_id]: player_color
+                                                   for track_id, player_color in frame["player_colors"].items()}
+            raw_frames.append(stitched_frame)
+    return raw_frames
+
+def detect_shards(video_path, num_frames, tracker_params, num_workers, overlap_frames=30, batch_size=4,
+                  start_frame=0, read_to_end=True):
+    """Raw per-frame tracks of num_frames frames from start_frame, detected shard by shard in a process pool.
+
+    With read_to_end the last shard continues past num_frames until the end of the video.
+    """
+    shards = make_shards(num_frames, num_workers, overlap_frames, open_end=read_to_end)
+    threads_per_worker = max(1, (multiprocessing.cpu_count() or 1) // num_workers)
+    # spawn: forking a process that already holds a model is not safe with torch
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(tracker_params, batch_size, threads_per_worker)) as executor:
+        futures = [executor.submit(_track_shard, video_path, start_frame + read_start,
+                                   start_frame + end if end is not None else None)
+                   for read_start, _, end in shards]
+        shard_frames = [future.result() for future in futures]
+    return stitch_shards(shards, shard_frames)
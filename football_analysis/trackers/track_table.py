@@ -0,0 +1,220 @@
+import numpy as np
+
+OBJECT_NAMES = ("players", "referees", "ball")
+
+class TrackTable:
+    """Columnar store of every tracked object in a video.
+
+    One row per (frame, object, track id), held in typed NumPy arrays instead of
+    the nested tracks[object][frame_num][track_id] dicts. Rows are sorted by
+    frame, object and track id, so a frame is a contiguous slice; a per-track
+    index gives the rows of one track in frame order. Missing values are NaN
+    (positions, speed, distance) or 0 (team).
+    """
+    def __init__(self, frame, track_id, object_class, bbox, num_frames):
+        frame = np.asarray(frame, dtype=np.int32)
+        track_id = np.asarray(track_id, dtype=np.int32)
+        object_class = np.asarray(object_class, dtype=np.int8)
+        bbox = np.asarray(bbox, dtype=np.float32).reshape(-1, 4)
+
+        order = np.lexsort((track_id, object_class, frame))
+        self.frame = frame[order]
+        self.track_id = track_id[order]
+        self.object_class = object_class[order]
+        self.bbox = bbox[order]
+        self.num_frames = num_frames
+
+        num_rows = len(self.frame)
+        self.position = np.full((num_rows, 2), np.nan, dtype=np.float32)
+        self.position_adjusted = np.full((num_rows, 2), np.nan, dtype=np.float32)
+        self.position_transformed = np.full((num_rows, 2), np.nan, dtype=np.float32)
+        self.speed = np.full(num_rows, np.nan, dtype=np.float64)
+        self.distance = np.full(num_rows, np.nan, dtype=np.float64)
+        self.team = np.zeros(num_rows, dtype=np.int8)
+        self.has_ball = np.zeros(num_rows, dtype=bool)
+        self.team_colors = {}
+
+        self._build_indexes()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _build_indexes(self):
+        # Per-frame index: rows of frame f are frame_offsets[f]:frame_offsets[f+1]
+        self.frame_offsets = np.searchsorted(self.frame, np.arange(self.num_frames + 1))
+
+        # Per-track index: rows of one track, in frame order
+        self._track_order = np.lexsort((self.frame, self.track_id, self.object_class))
+        track_class = self.object_class[self._track_order]
+        track_ids = self.track_id[self._track_order]
+        boundaries = np.flatnonzero((np.diff(track_class) != 0) | (np.diff(track_ids) != 0)) + 1
+        starts = np.concatenate(([0], boundaries)) if len(track_ids) else np.array([], dtype=np.int64)
+        ends = np.concatenate((boundaries, [len(track_ids)])) if len(track_ids) else np.array([], dtype=np.int64)
+        self._track_slices = {
+            (int(track_class[start]), int(track_ids[start])): (int(start), int(end))
+            for start, end in zip(starts, ends)
+        }
+
+    @staticmethod
+    def object_class_of(object_name):
+        return OBJECT_NAMES.index(object_name)
+
+    @classmethod
+    def from_tracks(cls, tracks):
+        """Build a table from the tracks[object][frame_num][track_id] dict layout"""
+        num_frames = max((len(tracks[name]) for name in OBJECT_NAMES if name in tracks), default=0)
+        frames, track_ids, classes, bboxes, infos = [], [], [], [], []
+        for object_class, object_name in enumerate(OBJECT_NAMES):
+            for frame_num, frame_tracks in enumerate(tracks.get(object_name, [])):
+                for track_id, track_info in frame_tracks.items():
+                    frames.append(frame_num)
+                    track_ids.append(track_id)
+                    classes.append(object_class)
+                    bboxes.append(track_info['bbox'])
+                    infos.append(track_info)
+
+        table = cls(frames, track_ids, classes, bboxes, num_frames)
+
+        # Rows were sorted on construction; restore the matching info dicts
+        order = np.lexsort((np.asarray(track_ids, dtype=np.int32),
+                            np.asarray(classes, dtype=np.int8),
+                            np.asarray(frames, dtype=np.int32)))
+        for row, info_index in enumerate(order):
+            table._set_row_from_info(row, infos[info_index])
+
+        return table
+
+    def _set_row_from_info(self, row, track_info):
+        for field in ('position', 'position_adjusted', 'position_transformed'):
+            value = track_info.get(field)
+            if value is not None:
+                getattr(self, field)[row] = np.asarray(value, dtype=np.float32).reshape(2)
+        if track_info.get('speed') is not None:
+            self.speed[row] = track_info['speed']
+        if track_info.get('distance') is not None:
+            self.distance[row] = track_info['distance']
+        if track_info.get('team') is not None:
+            self.team[row] = track_info['team']
+            if 'team_color' in track_info:
+                self.team_colors[int(track_info['team'])] = track_info['team_color']
+        self.has_ball[row] = bool(track_info.get('has_ball', False))
+
+    def object_mask(self, object_name):
+        return self.object_class == self.object_class_of(object_name)
+
+    def frame_rows(self, frame_num, object_name=None):
+        """Row indices of one frame, optionally restricted to one object type"""
+        start, end = self.frame_offsets[frame_num], self.frame_offsets[frame_num + 1]
+        if object_name is None:
+            return np.arange(start, end)
+        object_class = self.object_class_of(object_name)
+        frame_classes = self.object_class[start:end]
+        class_start = start + np.searchsorted(frame_classes, object_class, side='left')
+        class_end = start + np.searchsorted(frame_classes, object_class, side='right')
+        return np.arange(class_start, class_end)
+
+    def find_row(self, object_name, frame_num, track_id):
+        """Row index of a track in a frame, or None if it is not present"""
+        rows = self.frame_rows(frame_num, object_name)
+        position = np.searchsorted(self.track_id[rows], track_id)
+        if position < len(rows) and self.track_id[rows[position]] == track_id:
+            return int(rows[position])
+        return None
+
+    def track_rows(self, object_name, track_id):
+        """Row indices of one track, in frame order"""
+        key = (self.object_class_of(object_name), int(track_id))
+        if key not in self._track_slices:
+            return np.array([], dtype=np.int64)
+        start, end = self._track_slices[key]
+        return self._track_order[start:end]
+
+    def track_ids(self, object_name):
+        object_class = self.object_class_of(object_name)
+        return [track_id for cls, track_id in self._track_slices if cls == object_class]
+
+    def track_lengths(self, object_name):
+        """{track_id: number of frames the track appears in}"""
+        object_class = self.object_class_of(object_name)
+        return {track_id: end - start
+                for (cls, track_id), (start, end) in self._track_slices.items()
+                if cls == object_class}
+
+    def row_info(self, row):
+        """The dict the old tracks layout held for this row"""
+        info = {"bbox": self.bbox[row].tolist()}
+        if not np.isnan(self.position[row, 0]):
+            info['position'] = tuple(self.position[row].tolist())
+        if not np.isnan(self.position_adjusted[row, 0]):
+            info['position_adjusted'] = tuple(self.position_adjusted[row].tolist())
+            # The old layout stored None for positions outside the pitch
+            transformed = self.position_transformed[row]
+            info['position_transformed'] = None if np.isnan(transformed[0]) else transformed.tolist()
+        if not np.isnan(self.speed[row]):
+            info['speed'] = float(self.speed[row])
+        if not np.isnan(self.distance[row]):
+            info['distance'] = float(self.distance[row])
+        if self.team[row] > 0:
+            team = int(self.team[row])
+            info['team'] = team
+            if team in self.team_colors:
+                info['team_color'] = self.team_colors[team]
+        if self.has_ball[row]:
+            info['has_ball'] = True
+        return info
+
+    def frame_dict(self, object_name, frame_num):
+        return {int(self.track_id[row]): self.row_info(row) for row in self.frame_rows(frame_num, object_name)}
+
+    def to_tracks(self):
+        """Materialize the full nested-dict layout"""
+        return {object_name: [self.frame_dict(object_name, frame_num) for frame_num in range(self.num_frames)]
+                for object_name in OBJECT_NAMES}
+
+    def view(self):
+        """Read-only tracks[object][frame_num][track_id] access built lazily from the columns"""
+        return TrackTableView(self)
+
+class TrackTableView:
+    """Compatibility view with the old tracks dict interface.
+
+    Frame dicts are built on access, so writes to them are not stored back
+    into the table; update the table columns instead.
+    """
+    def __init__(self, table):
+        self.table = table
+        self._objects = {object_name: _ObjectFramesView(table, object_name) for object_name in OBJECT_NAMES}
+
+    def __getitem__(self, object_name):
+        return self._objects[object_name]
+
+    def __contains__(self, object_name):
+        return object_name in self._objects
+
+    def __iter__(self):
+        return iter(self._objects)
+
+    def keys(self):
+        return self._objects.keys()
+
+    def items(self):
+        return self._objects.items()
+
+class _ObjectFramesView:
+    def __init__(self, table, object_name):
+        self.table = table
+        self.object_name = object_name
+
+    def __len__(self):
+        return self.table.num_frames
+
+    def __getitem__(self, frame_num):
+        if frame_num < 0:
+            frame_num += self.table.num_frames
+        if not 0 <= frame_num < self.table.num_frames:
+            raise IndexError(frame_num)
+        return self.table.frame_dict(self.object_name, frame_num)
+
+    def __iter__(self):
+        for frame_num in range(self.table.num_frames):
+            yield self.table.frame_dict(self.object_name, frame_num)
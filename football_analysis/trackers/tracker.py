@@ -1,42 +1,84 @@
-from ultralytics import YOLO
 import supervision as sv
-import pickle
 import os
 import numpy as np
 import pandas as pd
 import cv2
+import itertools
 import sys 
 sys.path.append('../')
-from utils import get_center_of_bbox, get_bbox_width, get_foot_position
+from utils import get_center_of_bbox, get_bbox_width, get_foot_position, iter_frame_batches, draw_transparent_rectangle, get_video_properties
+from team_assigner import TeamAssigner
+from annotation_renderer import HIGHLIGHT_COLORS
+from .detection_engine import DetectionEngine, DEFAULT_FRAME_SIZE
+from .keyframe_detector import KeyframeDetector, compare_detections
+from .sharded_detection import detect_shards
+from .player_id_stabilizer import PlayerIdStabilizer
+
+# ByteTrack's default: frames a lost track is kept at 30 fps
+BYTETRACK_LOST_TRACK_BUFFER = 30
 
 class Tracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path) 
-        self.tracker = sv.ByteTrack()
+    def __init__(self, model_path, conf=0.1, imgsz=640, half=False, int8=False, backend='pytorch', batch_size=None,
+                 detection_stride=1, adaptive_keyframes=True, batches_in_flight=1, frame_rate=24,
+                 frame_size=DEFAULT_FRAME_SIZE):
+        # Kept so worker processes can build an identical tracker
+        self.init_params = dict(model_path=model_path, conf=conf, imgsz=imgsz, half=half, int8=int8,
+                                backend=backend, detection_stride=detection_stride,
+                                adaptive_keyframes=adaptive_keyframes, frame_rate=frame_rate)
+        self.detector = DetectionEngine(model_path, conf=conf, imgsz=imgsz, half=half, int8=int8,
+                                        backend=backend, batch_size=batch_size,
+                                        frame_size=frame_size, batches_in_flight=batches_in_flight)
+        self.model = self.detector.model
+        self.tracker = self.new_byte_tracker()
+        self.batch_size = self.detector.batch_size
+
+        # Detect every detection_stride frames and propagate boxes in between
+        self.keyframe_detector = None
+        if detection_stride > 1:
+            self.keyframe_detector = KeyframeDetector(self.detector, stride=detection_stride,
+                                                      adaptive=adaptive_keyframes)
 
         # ID Stabilization system
-        self.player_history = {}  # {original_id: [positions, last_seen_frame, stable_id]}
-        self.id_mapping = {}  # {current_id: stable_id}
-        self.next_stable_id = 1
-        self.max_distance_threshold = 100  # pixels - adjust based on video resolution
-        self.max_frames_missing = 30  # frames before considering player truly gone
-        self.position_smoothing = True  # Use position smoothing for better tracking
+        self.id_stabilizer = PlayerIdStabilizer(max_distance_threshold=100, max_frames_missing=30)
+        self.id_stabilizer.set_frame_rate(frame_rate)
+
+        # Jersey colours are sampled while tracking, when the frame is already decoded
+        self.team_assigner = TeamAssigner(frame_rate=frame_rate)
+        self.raw_sample_counts = {}
+
+    def new_byte_tracker(self):
+        """ByteTrack for the video's fps.
+
+        ByteTrack keeps a lost track for lost_track_buffer frames at 30 fps,
+        scaled to frame_rate. In keyframe mode a lost track can only be found
+        again on a keyframe, so the buffer is stretched by the stride to leave
+        it as many detections as with full detection.
+        """
+        stride = self.init_params['detection_stride']
+        return sv.ByteTrack(frame_rate=int(round(self.init_params['frame_rate'])),
+                            lost_track_buffer=BYTETRACK_LOST_TRACK_BUFFER * stride)
         
     def configure_stabilization(self, video_width=1920, video_height=1080, fps=24):
         """Configure stabilization parameters based on video characteristics"""
         # Adjust distance threshold based on resolution
         base_threshold = 100
         resolution_factor = ((video_width * video_height) / (1920 * 1080)) ** 0.5
-        self.max_distance_threshold = int(base_threshold * resolution_factor)
+        self.id_stabilizer.max_distance_threshold = int(base_threshold * resolution_factor)
         
         # Adjust frame tolerance based on FPS
         base_frames = 30
         fps_factor = fps / 24
-        self.max_frames_missing = int(base_frames * fps_factor)
+        self.id_stabilizer.max_frames_missing = int(base_frames * fps_factor)
+
+        # Sampling intervals are set in seconds; sharded workers get the fps through init_params
+        self.id_stabilizer.set_frame_rate(fps)
+        self.team_assigner.set_frame_rate(fps)
+        self.init_params['frame_rate'] = fps
+        self.tracker = self.new_byte_tracker()
         
         print(f"🔧 Estabilização configurada:")
-        print(f"   • Limiar de distância: {self.max_distance_threshold} pixels")
-        print(f"   • Tolerância: {self.max_frames_missing} frames")
+        print(f"   • Limiar de distância: {self.id_stabilizer.max_distance_threshold} pixels")
+        print(f"   • Tolerância: {self.id_stabilizer.max_frames_missing} frames")
 
     def add_position_to_tracks(sekf,tracks):
         for object, object_tracks in tracks.items():
@@ -49,6 +91,14 @@ class Tracker:
                         position = get_foot_position(bbox)
                     tracks[object][frame_num][track_id]['position'] = position
 
+    def add_position_to_table(self, table):
+        # Same integer positions as get_foot_position / get_center_of_bbox, for every row at once
+        bbox = table.bbox.astype(np.float64)
+        x_center = np.trunc((bbox[:,0] + bbox[:,2]) / 2)
+        is_ball = table.object_mask('ball')
+        y = np.where(is_ball, np.trunc((bbox[:,1] + bbox[:,3]) / 2), np.trunc(bbox[:,3]))
+        table.position[:] = np.stack([x_center, y], axis=1)
+
     def interpolate_ball_positions(self,ball_positions):
         ball_positions = [x.get(1,{}).get('bbox',[]) for x in ball_positions]
         df_ball_positions = pd.DataFrame(ball_positions,columns=['x1','y1','x2','y2'])
@@ -61,79 +111,216 @@ class Tracker:
 
         return ball_positions
 
-    def detect_frames(self, frames):
-        batch_size=20 
+    def detect_frames(self, frames, grays=None):
+        """grays optionally shares downscaled grayscale frames with keyframe mode"""
         detections = [] 
-        for i in range(0,len(frames),batch_size):
-            detections_batch = self.model.predict(frames[i:i+batch_size],conf=0.1)
-            detections += detections_batch
+        gray_batches = iter_frame_batches(grays, self.batch_size) if grays is not None else itertools.repeat(None)
+        for batch, gray_batch in zip(iter_frame_batches(frames, self.batch_size), gray_batches):
+            if self.keyframe_detector is not None:
+                detections += self.keyframe_detector.detect(batch, gray_batch)
+            else:
+                detections += self.detector.predict(batch)
         return detections
 
-    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
+    def reset_tracking_state(self):
+        """Start a new video: fresh ByteTrack, ID stabilization, team sampling and keyframe state"""
+        self.tracker = self.new_byte_tracker()
+        self.id_stabilizer.reset()
+        self.team_assigner.reset()
+        self.raw_sample_counts = {}  # {raw track id: colours sampled} in worker processes
+        if self.keyframe_detector is not None:
+            self.keyframe_detector.reset()
+
+    def evaluate_keyframe_detection(self, frames, iou_threshold=0.5):
+        """Accuracy of keyframe mode against full detection on the same frames.
+
+        Returns {class_name: {'recall', 'mean_iou'}} plus the share of frames
+        that were keyframes.
+        """
+        if self.keyframe_detector is None:
+            raise ValueError("Keyframe detection is disabled (detection_stride=1)")
+
+        self.reset_tracking_state()
+        full_detections, keyframe_detections = [], []
+        for batch in iter_frame_batches(frames, self.batch_size):
+            full_detections += self.detector.predict(batch)
+            keyframe_detections += self.keyframe_detector.detect(batch)
+
+        report = compare_detections(full_detections, keyframe_detections, self.detector.names, iou_threshold)
+        report['keyframe_ratio'] = self.keyframe_detector.keyframe_ratio()
+        self.reset_tracking_state()
+        return report
+
+    def get_cache_params(self):
+        """Parameters that change the tracks, used to key the track cache"""
+        return {
+            **self.detector.get_cache_params(),
+            'frame_rate': self.init_params['frame_rate'],
+            'keyframes': self.keyframe_detector.get_cache_params() if self.keyframe_detector is not None else None,
+            'stabilization': self.id_stabilizer.get_cache_params(),
+            'teams': self.team_assigner.get_params(),
+        }
+
+    def load_cached_tracks(self, cache, cache_key):
+        """Cached tracks, restoring the team colour model sampled with them; None on a miss"""
+        if cache is None or cache_key is None:
+            return None
+        cached = cache.get(cache_key)
+        if cached is None:
+            return None
+        self.team_assigner.load_state(cached['teams'])
+        return cached['tracks']
+
+    def save_cached_tracks(self, cache, cache_key, tracks):
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, {'tracks': tracks, 'teams': self.team_assigner.get_state()})
+
+    def get_object_tracks(self, frames, cache=None, cache_key=None):
         
-        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path,'rb') as f:
-                tracks = pickle.load(f)
+        tracks = self.load_cached_tracks(cache, cache_key)
+        if tracks is not None:
             return tracks
 
-        detections = self.detect_frames(frames)
+        tracks = self.init_tracks()
+        self.reset_tracking_state()
 
-        tracks={
+        # Detect one bounded batch at a time so frames can be released as soon as they are tracked
+        for frame_batch in iter_frame_batches(frames, self.batch_size):
+            for frame, detection in zip(frame_batch, self.detect_frames(frame_batch)):
+                self.add_detection_to_tracks(tracks, detection, frame)
+        self.team_assigner.finalize()
+
+        self.save_cached_tracks(cache, cache_key, tracks)
+
+        return tracks
+
+    def init_tracks(self):
+        return {
             "players":[],
             "referees":[],
             "ball":[]
         }
 
-        for frame_num, detection in enumerate(detections):
-            cls_names = detection.names
-            cls_names_inv = {v:k for k,v in cls_names.items()}
-
-            # Covert to supervision Detection format
-            detection_supervision = sv.Detections.from_ultralytics(detection)
+    def add_detection_to_tracks(self, tracks, detection_supervision, frame=None):
+        self.add_raw_frame_to_tracks(tracks, self.track_detections(detection_supervision), frame)
 
-            # Convert GoalKeeper to player object
-            for object_ind , class_id in enumerate(detection_supervision.class_id):
-                if cls_names[class_id] == "goalkeeper":
-                    detection_supervision.class_id[object_ind] = cls_names_inv["player"]
+    def track_detections(self, detection_supervision):
+        """Run ByteTrack on one frame's detections; player IDs are not stabilized yet"""
+        cls_names_inv = self.detector.names_inv
 
-            # Track Objects
-            detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
+        # Convert GoalKeeper to player object
+        if "goalkeeper" in cls_names_inv:
+            is_goalkeeper = detection_supervision.class_id == cls_names_inv["goalkeeper"]
+            detection_supervision.class_id[is_goalkeeper] = cls_names_inv["player"]
 
-            tracks["players"].append({})
-            tracks["referees"].append({})
-            tracks["ball"].append({})
+        # Track Objects
+        detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
 
-            # Collect player detections for stabilization
-            raw_player_detections = {}
+        raw_frame = {"players":{}, "referees":{}, "ball":{}}
 
-            for frame_detection in detection_with_tracks:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-                track_id = frame_detection[4]
+        for frame_detection in detection_with_tracks:
+            bbox = frame_detection[0].tolist()
+            cls_id = frame_detection[3]
+            track_id = frame_detection[4]
 
-                if cls_id == cls_names_inv['player']:
-                    raw_player_detections[track_id] = {"bbox":bbox}
-                
-                if cls_id == cls_names_inv['referee']:
-                    tracks["referees"][frame_num][track_id] = {"bbox":bbox}
-            
-            # Apply ID stabilization to players
-            stabilized_players = self.stabilize_player_ids(raw_player_detections, frame_num)
-            tracks["players"][frame_num] = stabilized_players
+            if cls_id == cls_names_inv['player']:
+                raw_frame["players"][track_id] = {"bbox":bbox}
             
-            for frame_detection in detection_supervision:
-                bbox = frame_detection[0].tolist()
-                cls_id = frame_detection[3]
-
-                if cls_id == cls_names_inv['ball']:
-                    tracks["ball"][frame_num][1] = {"bbox":bbox}
+            if cls_id == cls_names_inv['referee']:
+                raw_frame["referees"][track_id] = {"bbox":bbox}
+        
+        for frame_detection in detection_supervision:
+            bbox = frame_detection[0].tolist()
+            cls_id = frame_detection[3]
+
+            if cls_id == cls_names_inv['ball']:
+                raw_frame["ball"][1] = {"bbox":bbox}
+
+        return raw_frame
+
+    def add_raw_frame_to_tracks(self, tracks, raw_frame, frame=None):
+        frame_num = len(tracks["players"])
+
+        # Apply ID stabilization to players
+        players = self.stabilize_player_ids(raw_frame["players"], frame_num, frame)
+        tracks["players"].append(players)
+        tracks["referees"].append(raw_frame["referees"])
+        tracks["ball"].append(raw_frame["ball"])
+
+        # Team colours: crop the players due for a sample from the frame in hand,
+        # or use colours a worker process sampled for the raw track IDs
+        if frame is not None:
+            self.team_assigner.observe(frame, frame_num, [player['bbox'] for player in players.values()],
+                                       list(players.keys()))
+        elif raw_frame.get("player_colors"):
+            # Same rule as in process: only stable IDs due for a vote, at most max_votes each
+            stable_ids = [self.id_stabilizer.id_mapping[track_id] for track_id in raw_frame["player_colors"]]
+            player_colors = list(raw_frame["player_colors"].values())
+            due = self.team_assigner.due_players(frame_num, stable_ids)
+            if due:
+                self.team_assigner.add_samples(frame_num, [stable_ids[i] for i in due],
+                                               [player_colors[i] for i in due])
+
+    def sample_raw_player_colors(self, raw_frame, frame, frame_num):
+        """{raw track id: jersey colour} for the raw players due for a team sample.
+
+        Workers do not vote, so the max_votes cap is applied to the number of
+        samples of each raw track; the parent applies it again per stable ID.
+        """
+        track_ids = list(raw_frame["players"].keys())
+        due = [i for i in self.team_assigner.due_players(frame_num, track_ids)
+               if self.raw_sample_counts.get(int(track_ids[i]), 0) < self.team_assigner.max_votes]
+        if not due:
+            return {}
+        player_colors = self.team_assigner.get_player_colors(frame, [raw_frame["players"][track_ids[i]]['bbox'] for i in due])
+        for i in due:
+            self.team_assigner.player_last_sample[int(track_ids[i])] = frame_num
+            self.raw_sample_counts[int(track_ids[i])] = self.raw_sample_counts.get(int(track_ids[i]), 0) + 1
+        return {track_ids[i]: player_color for i, player_color in zip(due, player_colors)}
+
+    def get_object_tracks_sharded(self, video_path, num_frames=None, num_workers=None, overlap_frames=30,
+                                  cache=None, cache_key=None, start_frame=0, end_frame=None):
+        """get_object_tracks over time shards detected in parallel worker processes.
+
+        Every worker holds its own model and ByteTrack; shard track IDs are
+        matched by IoU over the overlapping frames, and player IDs are then
+        stabilized over the whole video here, in frame order. Without
+        end_frame the shards are split by the container's frame count
+        (num_frames), which can be wrong, so the last shard reads until the
+        decoder runs out.
+
+        Frames never leave the workers, so player IDs are stabilized by
+        position only: the appearance re-identification of the in-process
+        path is not available in sharded mode.
+        """
+        tracks = self.load_cached_tracks(cache, cache_key)
+        if tracks is not None:
+            return tracks
 
-        if stub_path is not None:
-            with open(stub_path,'wb') as f:
-                pickle.dump(tracks,f)
+        read_to_end = end_frame is None
+        if not read_to_end:
+            num_frames = end_frame - start_frame
+        elif num_frames is None:
+            num_frames = max(0, get_video_properties(video_path)['frame_count'] - start_frame)
+        num_workers = num_workers or max(1, (os.cpu_count() or 1) // 2)
+        raw_frames = detect_shards(video_path, num_frames, self.init_params, num_workers,
+                                   overlap_frames, max(1, self.batch_size // num_workers),
+                                   start_frame=start_frame, read_to_end=read_to_end)
+        if len(raw_frames) != num_frames:
+            print(f"⚠️  O vídeo tem {len(raw_frames)} frames, não {num_frames} como informa o container")
+
+        print("⚠️  Modo paralelo: IDs de jogadores reconectados só pela posição (sem re-identificação por aparência)")
+        tracks = self.init_tracks()
+        self.id_stabilizer.reset()
+        self.team_assigner.reset()
+        for raw_frame in raw_frames:
+            self.add_raw_frame_to_tracks(tracks, raw_frame)
+        self.team_assigner.finalize()
+
+        self.save_cached_tracks(cache, cache_key, tracks)
 
         return tracks
-    
+
     def draw_ellipse(self,frame,bbox,color,track_id=None):
         y2 = int(bbox[3])
         x_center, _ = get_center_of_bbox(bbox)
@@ -195,19 +382,20 @@ class Tracker:
 
         return frame
 
-    def draw_team_ball_control(self,frame,frame_num,team_ball_control):
+    def get_ball_control_percentages(self, team_ball_control):
+        """Share of ball control of each team up to every frame, from prefix sums computed once"""
+        team_ball_control = np.asarray(team_ball_control)
+        team_1_num_frames = np.cumsum(team_ball_control == 1)
+        team_2_num_frames = np.cumsum(team_ball_control == 2)
+        total_frames = np.maximum(team_1_num_frames + team_2_num_frames, 1)
+        return np.stack([team_1_num_frames / total_frames, team_2_num_frames / total_frames], axis=1)
+
+    def draw_team_ball_control(self,frame,frame_num,ball_control_percentages):
         # Draw a semi-transparent rectaggle 
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (1350, 850), (1900,970), (255,255,255), -1 )
         alpha = 0.4
-        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+        draw_transparent_rectangle(frame, (1350, 850), (1900,970), (255,255,255), alpha)
 
-        team_ball_control_till_frame = team_ball_control[:frame_num+1]
-        # Get the number of time each team had ball control
-        team_1_num_frames = team_ball_control_till_frame[team_ball_control_till_frame==1].shape[0]
-        team_2_num_frames = team_ball_control_till_frame[team_ball_control_till_frame==2].shape[0]
-        team_1 = team_1_num_frames/(team_1_num_frames+team_2_num_frames)
-        team_2 = team_2_num_frames/(team_1_num_frames+team_2_num_frames)
+        team_1, team_2 = ball_control_percentages[frame_num]
 
         cv2.putText(frame, f"Team 1 Ball Control: {team_1*100:.2f}%",(1400,900), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,0,0), 3)
         cv2.putText(frame, f"Team 2 Ball Control: {team_2*100:.2f}%",(1400,950), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,0,0), 3)
@@ -216,154 +404,68 @@ class Tracker:
 
     def draw_annotations(self,video_frames, tracks,team_ball_control, highlighted_players=None):
         output_video_frames= []
+        ball_control_percentages = self.get_ball_control_percentages(team_ball_control)
         for frame_num, frame in enumerate(video_frames):
             frame = frame.copy()
+            frame = self.draw_frame_annotations(frame, frame_num, tracks, ball_control_percentages, highlighted_players)
+            output_video_frames.append(frame)
 
-            # Check if frame_num is within bounds for all track types
-            if (frame_num >= len(tracks["players"]) or 
-                frame_num >= len(tracks["ball"]) or 
-                frame_num >= len(tracks["referees"])):
-                output_video_frames.append(frame)
-                continue
-
-            player_dict = tracks["players"][frame_num]
-            ball_dict = tracks["ball"][frame_num]
-            referee_dict = tracks["referees"][frame_num]
-
-            # Draw Players
-            for track_id, player in player_dict.items():
-                color = player.get("team_color",(0,0,255))
-                
-                # Highlight the chosen players with different colors
-                if highlighted_players is not None and track_id in highlighted_players:
-                    # Get player index for color variation
-                    player_index = highlighted_players.index(track_id)
-                    highlight_colors = [
-                        (0, 255, 255),    # Yellow (Cyan)
-                        (255, 0, 255),    # Magenta
-                        (0, 255, 0),      # Green
-                        (255, 165, 0),    # Orange
-                        (255, 0, 0),      # Red
-                        (128, 0, 128),    # Purple
-                        (0, 128, 255),    # Light Blue
-                        (255, 255, 0)     # Bright Yellow
-                    ]
-                    highlight_color = highlight_colors[player_index % len(highlight_colors)]
-                    
-                    # Draw a special highlight for the chosen player
-                    bbox = player["bbox"]
-                    cv2.rectangle(frame, 
-                                (int(bbox[0]-5), int(bbox[1]-5)), 
-                                (int(bbox[2]+5), int(bbox[3]+5)), 
-                                highlight_color, 4)  # Colored highlight
-                    color = highlight_color  # Use highlight color
-                
-                frame = self.draw_ellipse(frame, player["bbox"],color, track_id)
-
-                if player.get('has_ball',False):
-                    frame = self.draw_traingle(frame, player["bbox"],(0,0,255))
+        return output_video_frames
 
-            # Draw Referee
-            for _, referee in referee_dict.items():
-                frame = self.draw_ellipse(frame, referee["bbox"],(0,255,255))
-            
-            # Draw ball 
-            for track_id, ball in ball_dict.items():
-                frame = self.draw_traingle(frame, ball["bbox"],(0,255,0))
+    def draw_frame_annotations(self, frame, frame_num, tracks, ball_control_percentages, highlighted_players=None):
+        """Draw the tracks of a single frame in place"""
+        # Check if frame_num is within bounds for all track types
+        if (frame_num >= len(tracks["players"]) or 
+            frame_num >= len(tracks["ball"]) or 
+            frame_num >= len(tracks["referees"])):
+            return frame
 
+        player_dict = tracks["players"][frame_num]
+        ball_dict = tracks["ball"][frame_num]
+        referee_dict = tracks["referees"][frame_num]
 
-            # Draw Team Ball Control
-            frame = self.draw_team_ball_control(frame, frame_num, team_ball_control)
+        frame = self.draw_frame_tracks(frame, player_dict, referee_dict, ball_dict, highlighted_players)
 
-            output_video_frames.append(frame)
+        # Draw Team Ball Control
+        frame = self.draw_team_ball_control(frame, frame_num, ball_control_percentages)
 
-        return output_video_frames
+        return frame
 
-    def stabilize_player_ids(self, detections, frame_num):
-        """Maintain consistent player IDs throughout the video"""
-        stabilized_detections = {}
-        current_positions = {}
-        
-        # Get current positions
-        for track_id, detection in detections.items():
-            if 'bbox' in detection:
-                center = get_center_of_bbox(detection['bbox'])
-                current_positions[track_id] = center
-        
-        # Update history and handle missing players
-        for original_id in list(self.player_history.keys()):
-            history = self.player_history[original_id]
-            if frame_num - history['last_seen'] > self.max_frames_missing:
-                # Player has been missing too long, remove from history
-                if history['stable_id'] in self.id_mapping.values():
-                    # Remove from current mapping
-                    keys_to_remove = [k for k, v in self.id_mapping.items() if v == history['stable_id']]
-                    for key in keys_to_remove:
-                        del self.id_mapping[key]
-                del self.player_history[original_id]
-        
-        # Process current detections
-        for track_id, detection in detections.items():
-            if 'bbox' not in detection:
-                continue
-                
-            center = get_center_of_bbox(detection['bbox'])
-            stable_id = None
-            
-            # Check if this track_id already has a stable mapping
-            if track_id in self.id_mapping:
-                stable_id = self.id_mapping[track_id]
-            else:
-                # Try to find the closest player from history
-                min_distance = float('inf')
-                best_match_id = None
-                
-                for original_id, history in self.player_history.items():
-                    if frame_num - history['last_seen'] <= self.max_frames_missing:
-                        # Calculate distance from last known position
-                        last_pos = history['positions'][-1] if history['positions'] else None
-                        if last_pos:
-                            distance = np.sqrt((center[0] - last_pos[0])**2 + (center[1] - last_pos[1])**2)
-                            if distance < min_distance and distance < self.max_distance_threshold:
-                                min_distance = distance
-                                best_match_id = original_id
-                
-                if best_match_id:
-                    # Reassign to existing stable ID
-                    stable_id = self.player_history[best_match_id]['stable_id']
-                    self.id_mapping[track_id] = stable_id
-                    
-                    # Update history
-                    self.player_history[best_match_id]['positions'].append(center)
-                    self.player_history[best_match_id]['last_seen'] = frame_num
-                    
-                    # Keep position history manageable
-                    if len(self.player_history[best_match_id]['positions']) > 10:
-                        self.player_history[best_match_id]['positions'] = self.player_history[best_match_id]['positions'][-10:]
-                else:
-                    # Create new stable ID
-                    stable_id = self.next_stable_id
-                    self.next_stable_id += 1
-                    self.id_mapping[track_id] = stable_id
-                    
-                    # Add to history
-                    self.player_history[track_id] = {
-                        'positions': [center],
-                        'last_seen': frame_num,
-                        'stable_id': stable_id
-                    }
+    def draw_frame_tracks(self, frame, player_dict, referee_dict, ball_dict, highlighted_players=None):
+        """Draw players, referees and ball of one frame in place"""
+        # Draw Players
+        for track_id, player in player_dict.items():
+            color = player.get("team_color",(0,0,255))
             
-            # Update existing history
-            if track_id in self.player_history:
-                self.player_history[track_id]['positions'].append(center)
-                self.player_history[track_id]['last_seen'] = frame_num
+            # Highlight the chosen players with different colors
+            if highlighted_players is not None and track_id in highlighted_players:
+                # Get player index for color variation
+                player_index = highlighted_players.index(track_id)
+                highlight_color = HIGHLIGHT_COLORS[player_index % len(HIGHLIGHT_COLORS)]
                 
-                # Keep position history manageable
-                if len(self.player_history[track_id]['positions']) > 10:
-                    self.player_history[track_id]['positions'] = self.player_history[track_id]['positions'][-10:]
+                # Draw a special highlight for the chosen player
+                bbox = player["bbox"]
+                cv2.rectangle(frame, 
+                            (int(bbox[0]-5), int(bbox[1]-5)), 
+                            (int(bbox[2]+5), int(bbox[3]+5)), 
+                            highlight_color, 4)  # Colored highlight
+                color = highlight_color  # Use highlight color
             
-            # Create stabilized detection with stable ID
-            stabilized_detection = detection.copy()
-            stabilized_detections[stable_id] = stabilized_detection
+            frame = self.draw_ellipse(frame, player["bbox"],color, track_id)
+
+            if player.get('has_ball',False):
+                frame = self.draw_traingle(frame, player["bbox"],(0,0,255))
+
+        # Draw Referee
+        for _, referee in referee_dict.items():
+            frame = self.draw_ellipse(frame, referee["bbox"],(0,255,255))
         
-        return stabilized_detections
\ No newline at end of file
+        # Draw ball 
+        for track_id, ball in ball_dict.items():
+            frame = self.draw_traingle(frame, ball["bbox"],(0,255,0))
+
+        return frame
+
+    def stabilize_player_ids(self, detections, frame_num, frame=None):
+        """Maintain consistent player IDs throughout the video; with the frame, appearance helps re-identification"""
+        return self.id_stabilizer.update(detections, frame_num, frame)
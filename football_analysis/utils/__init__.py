@@ -1,2 +1,5 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance,measure_xy_distance,get_foot_position
\ No newline at end of file
+from .video_utils import read_video, save_video, iter_video_frames, iter_frame_batches, read_frame, get_video_properties, get_analysis_scale, downscale_gray, parse_timestamp, get_segment_frames
+from .video_sink import VideoSink
+from .video_repair import probe_video, can_decode, make_video_readable, NotAVideoError
+from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance,measure_xy_distance,get_foot_position
+from .drawing_utils import draw_transparent_rectangle
\ No newline at end of file
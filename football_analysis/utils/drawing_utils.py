@@ -0,0 +1,20 @@
+import cv2
+import numpy as np
+
+def draw_transparent_rectangle(frame, top_left, bottom_right, color, alpha):
+    """Blend a filled rectangle into frame in place.
+
+    Same result as drawing on a full-frame copy and calling addWeighted on the
+    whole frame, but only the pixels under the rectangle are touched.
+    """
+    x1, y1 = max(int(top_left[0]), 0), max(int(top_left[1]), 0)
+    # cv2.rectangle includes the bottom-right corner
+    x2, y2 = min(int(bottom_right[0]) + 1, frame.shape[1]), min(int(bottom_right[1]) + 1, frame.shape[0])
+    if x1 >= x2 or y1 >= y2:
+        return frame
+
+    roi = frame[y1:y2, x1:x2]
+    overlay = np.empty_like(roi)
+    overlay[:] = color
+    roi[:] = cv2.addWeighted(overlay, alpha, roi, 1 - alpha, 0)
+    return frame
@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import cv2
+
+# Video codecs OpenCV's FFmpeg backend decodes: for these an unreadable file is a
+# container problem and copying the stream into a new container is enough
+DECODABLE_CODECS = {'h264', 'hevc', 'mpeg4', 'mpeg2video', 'mpeg1video', 'mjpeg', 'vp8', 'vp9', 'av1',
+                    'msmpeg4v2', 'msmpeg4v3', 'h263', 'theora'}
+# Codecs MP4 can hold; the others are remuxed into Matroska
+MP4_CODECS = {'h264', 'hevc', 'mpeg4', 'mpeg2video', 'mpeg1video', 'mjpeg', 'vp9', 'av1'}
+
+class NotAVideoError(ValueError):
+    """The file has no video stream at all, as opposed to a video that could not be repaired"""
+
+def probe_video(video_path, timeout=30):
+    """Container and first video stream of a file from ffprobe, or None when ffprobe cannot read it"""
+    command = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams',
+               '-select_streams', 'v:0', video_path]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        return None
+    info = json.loads(result.stdout or '{}')
+    streams = info.get('streams') or []
+    return {
+        'format': info.get('format', {}).get('format_name'),
+        'codec': streams[0].get('codec_name') if streams else None,
+        'width': streams[0].get('width') if streams else None,
+        'height': streams[0].get('height') if streams else None,
+    }
+
+def can_decode(video_path):
+    """True when OpenCV opens the file and decodes its first frame"""
+    cap = cv2.VideoCapture(video_path)
+    readable = cap.isOpened() and cap.read()[0]
+    cap.release()
+    return readable
+
+def remux_video(video_path, output_path, timeout=300):
+    """Copy the first video stream into a new container without re-encoding"""
+    command = ['ffmpeg', '-y', '-v', 'error', '-i', video_path, '-map', '0:v:0', '-c', 'copy', '-an']
+    if output_path.endswith('.mp4'):
+        command += ['-movflags', '+faststart']
+    result = subprocess.run(command + [output_path], capture_output=True, text=True, timeout=timeout)
+    return result.returncode == 0
+
+def transcode_video(video_path, output_path, preset='veryfast', crf=23, timeout=None):
+    """Re-encode the first video stream to H.264 with a fast preset; audio is dropped"""
+    command = ['ffmpeg', '-y', '-v', 'error', '-i', video_path, '-map', '0:v:0', '-an',
+               '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+               '-movflags', '+faststart', output_path]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    return result.returncode == 0
+
+def make_video_readable(video_path, output_dir=None, preset='veryfast'):
+    """Path of an OpenCV-readable version of video_path and how it was obtained.
+
+    Returns (path, method) with method 'original', 'remux' or 'transcode'.
+    The file is probed first: a known codec in a container OpenCV cannot read
+    is only remuxed (stream copy, seconds), and the video is transcoded with a
+    fast preset only when the codec itself is the problem or the remux did not
+    help. The original file is left in place, and a readable version made by
+    an earlier call is reused. Raises NotAVideoError when ffprobe finds no
+    video stream, and ValueError when a video cannot be repaired.
+    """
+    if can_decode(video_path):
+        return video_path, 'original'
+
+    output_dir = output_dir or os.path.dirname(video_path)
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    candidates = [(os.path.join(output_dir, f"{base_name}_remux{extension}"), 'remux') for extension in ('.mp4', '.mkv')]
+    candidates.append((os.path.join(output_dir, f"{base_name}_h264.mp4"), 'transcode'))
+    for repaired_path, method in candidates:
+        if (os.path.exists(repaired_path) and os.path.getmtime(repaired_path) >= os.path.getmtime(video_path)
+                and can_decode(repaired_path)):
+            return repaired_path, method
+
+    info = probe_video(video_path)
+    if info is None or info['codec'] is None:
+        raise NotAVideoError("No readable video stream in the file")
+
+    if info['codec'] in DECODABLE_CODECS:
+        extension = '.mp4' if info['codec'] in MP4_CODECS else '.mkv'
+        remuxed_path = os.path.join(output_dir, f"{base_name}_remux{extension}")
+        if remux_video(video_path, remuxed_path) and can_decode(remuxed_path):
+            return remuxed_path, 'remux'
+        if os.path.exists(remuxed_path):
+            os.remove(remuxed_path)
+
+    transcoded_path = os.path.join(output_dir, f"{base_name}_h264.mp4")
+    if transcode_video(video_path, transcoded_path, preset=preset) and can_decode(transcoded_path):
+        return transcoded_path, 'transcode'
+    if os.path.exists(transcoded_path):
+        os.remove(transcoded_path)
+    raise ValueError(f"Could not convert the video ({info['codec']} in {info['format']})")
@@ -0,0 +1,147 @@
+import os
+import shutil
+import subprocess
+import time
+import cv2
+
+# OpenCV fourcc used for each container when ffmpeg is not available
+OPENCV_FOURCC = {
+    '.avi': 'XVID',
+    '.mp4': 'mp4v',
+    '.mov': 'mp4v',
+    '.mkv': 'XVID',
+}
+
+class VideoSink:
+    """Encoder that takes frames one at a time, as they are rendered.
+
+    With the 'ffmpeg' backend raw BGR frames are piped to an ffmpeg process
+    encoding H.264 (libx264) with a CPU speed preset, so encoding runs in its
+    own process alongside rendering and produces small, web-playable MP4 files
+    (faststart). The 'opencv' backend uses cv2.VideoWriter. 'auto' picks
+    ffmpeg when it is installed and the container supports H.264.
+
+    The frame size defaults to the first frame written, so the source
+    resolution is kept; fps should be the source fps.
+    """
+    def __init__(self, output_path, fps=24, frame_size=None, backend='auto',
+                 preset='veryfast', crf=23, fourcc=None):
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.preset = preset
+        self.crf = crf
+        self.extension = os.path.splitext(output_path)[1].lower()
+        self.fourcc = fourcc or OPENCV_FOURCC.get(self.extension, 'XVID')
+
+        if backend == 'auto':
+            h264_container = self.extension in ('.mp4', '.mov', '.mkv')
+            backend = 'ffmpeg' if h264_container and shutil.which('ffmpeg') else 'opencv'
+        if backend not in ('ffmpeg', 'opencv'):
+            raise ValueError(f"Unknown video sink backend: {backend}")
+        self.backend = backend
+
+        self.frames_written = 0
+        self.write_time = 0.0
+        self.start_time = None
+        self.end_time = None
+        self._process = None
+        self._writer = None
+
+    def _open(self):
+        width, height = self.frame_size
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if self.backend == 'opencv':
+            fourcc = cv2.VideoWriter_fourcc(*self.fourcc)
+            self._writer = cv2.VideoWriter(self.output_path, fourcc, self.fps, (width, height))
+            if not self._writer.isOpened():
+                raise RuntimeError(f"Could not open video writer for {self.output_path}")
+            return
+
+        command = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(self.fps),
+            '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+            # yuv420p needs even dimensions: pad odd sizes by one pixel
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p',
+        ]
+        if self.extension in ('.mp4', '.mov'):
+            command += ['-movflags', '+faststart']
+        command.append(self.output_path)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        if self.start_time is None:
+            self.start_time = time.time()
+        if self.frame_size is None:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+        if self._writer is None and self._process is None:
+            self._open()
+        if (frame.shape[1], frame.shape[0]) != tuple(self.frame_size):
+            frame = cv2.resize(frame, tuple(self.frame_size), interpolation=cv2.INTER_AREA)
+
+        start = time.time()
+        if self._writer is not None:
+            self._writer.write(frame)
+        else:
+            try:
+                self._process.stdin.write(frame.tobytes())
+            except BrokenPipeError:
+                raise RuntimeError(f"ffmpeg stopped encoding {self.output_path}: {self._ffmpeg_error()}")
+        self.write_time += time.time() - start
+        self.frames_written += 1
+
+    def _ffmpeg_error(self):
+        self._process.wait()
+        return self._process.stderr.read().decode(errors='replace').strip()
+
+    def close(self):
+        if self.end_time is not None:
+            return
+        start = time.time()
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        if self._process is not None:
+            self._process.stdin.close()
+            return_code = self._process.wait()
+            error = self._process.stderr.read().decode(errors='replace').strip()
+            self._process.stderr.close()
+            self._process = None
+            if return_code != 0:
+                raise RuntimeError(f"ffmpeg failed to encode {self.output_path}: {error}")
+        self.write_time += time.time() - start
+        # Closing waits for ffmpeg to flush and exit, so the encode time ends here
+        self.end_time = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def stats(self):
+        """Frames written and encode throughput.
+
+        encode_fps counts the frames over the time from the first write until
+        close() returned (ffmpeg finished encoding); while frames are still
+        coming in it is only as fast as the renderer feeding the sink.
+        write_time is the time write()/close() blocked the caller, which with
+        the ffmpeg backend is much less than the encoding time.
+        """
+        if self.start_time is None:
+            wall_time = 0.0
+        else:
+            wall_time = (self.end_time if self.end_time is not None else time.time()) - self.start_time
+        return {
+            'backend': self.backend,
+            'frames': self.frames_written,
+            'encode_fps': self.frames_written / wall_time if wall_time > 0 else 0.0,
+            'wall_time': wall_time,
+            'write_time': self.write_time,
+            'file_size': os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0,
+        }
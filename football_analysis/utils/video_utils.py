@@ -1,18 +1,104 @@
 import cv2
+import math
+from .video_sink import VideoSink
 
-def read_video(video_path):
+def read_video(video_path, start_frame=0, end_frame=None):
+    return list(iter_video_frames(video_path, start_frame, end_frame))
+
+def iter_video_frames(video_path, start_frame=0, end_frame=None):
+    """Decode frames one at a time instead of holding the whole video in memory.
+
+    start_frame/end_frame restrict decoding to [start_frame, end_frame).
+    """
+    cap = cv2.VideoCapture(video_path)
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_num = start_frame
+    try:
+        while end_frame is None or frame_num < end_frame:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_num += 1
+            yield frame
+    finally:
+        cap.release()
+
+def iter_frame_batches(frames, batch_size):
+    """Group any iterable of frames into lists of at most batch_size frames"""
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def get_analysis_scale(frame_height, analysis_height=540):
+    """Downscale factor that brings frames to analysis_height, never upscaling"""
+    return min(1.0, analysis_height / frame_height)
+
+def downscale_gray(frame, scale):
+    """Grayscale frame resized by scale; halvings go through the image pyramid (pyrDown)"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if scale >= 1:
+        return gray
+    height, width = gray.shape
+    target_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    for _ in range(int(math.floor(math.log2(1 / scale) + 1e-9))):
+        gray = cv2.pyrDown(gray)
+    if (gray.shape[1], gray.shape[0]) != target_size:
+        gray = cv2.resize(gray, target_size, interpolation=cv2.INTER_AREA)
+    return gray
+
+def read_frame(video_path, frame_num):
     cap = cv2.VideoCapture(video_path)
-    frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
-    return frames
-
-def save_video(ouput_video_frames,output_video_path):
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out = cv2.VideoWriter(output_video_path, fourcc, 24, (ouput_video_frames[0].shape[1], ouput_video_frames[0].shape[0]))
-    for frame in ouput_video_frames:
-        out.write(frame)
-    out.release()
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+    ret, frame = cap.read()
+    cap.release()
+    return frame if ret else None
+
+def get_video_properties(video_path, default_fps=24):
+    """Read the stream properties once; fps falls back to default_fps when the container has none"""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    properties = {
+        'fps': fps if fps and fps > 0 else default_fps,
+        'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    cap.release()
+    return properties
+
+def parse_timestamp(text):
+    """Seconds from a timestamp such as '90', '1:30' or '1:02:03.5'"""
+    seconds = 0.0
+    for part in text.strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def get_segment_frames(video_properties, start_frame=None, end_frame=None, start_time=None, end_time=None):
+    """[start_frame, end_frame) of a segment given by frame numbers or times in seconds, clamped to the video"""
+    fps = video_properties['fps']
+    frame_count = video_properties['frame_count']
+    if start_frame is None:
+        start_frame = int(round(start_time * fps)) if start_time is not None else 0
+    if end_frame is None:
+        end_frame = int(round(end_time * fps)) if end_time is not None else frame_count
+    start_frame = max(0, int(start_frame))
+    end_frame = min(frame_count, int(end_frame)) if frame_count > 0 else int(end_frame)
+    if end_frame <= start_frame:
+        raise ValueError(f"Empty segment: frames {start_frame}-{end_frame} of a {frame_count}-frame video")
+    return start_frame, end_frame
+
+def save_video(ouput_video_frames,output_video_path,fps=24,**sink_options):
+    """Encode frames as they arrive (frames may be a generator) and return the encoder stats.
+
+    sink_options go to VideoSink (backend, preset, crf, fourcc, frame_size).
+    """
+    with VideoSink(output_video_path, fps=fps, **sink_options) as sink:
+        for frame in ouput_video_frames:
+            sink.write(frame)
+    return sink.stats()
@@ -23,23 +23,60 @@ class ViewTransformer():
 
         self.persepctive_trasnformer = cv2.getPerspectiveTransform(self.pixel_vertices, self.target_vertices)
 
+    def points_inside_court(self, points):
+        """Vectorized equivalent of pointPolygonTest(...) >= 0 on integer pixel positions.
+
+        pixel_vertices is the image of a rectangle under a perspective
+        transform and therefore convex: a point is inside (or on the border)
+        when it lies on the same side of every edge.
+        """
+        points = np.trunc(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        vertices = self.pixel_vertices.astype(np.float64)
+        edge_start = vertices
+        edge_end = np.roll(vertices, -1, axis=0)
+
+        # Cross product of each edge with the vector from its start to each point: (n_points, n_edges)
+        cross = ((edge_end[:, 0] - edge_start[:, 0]) * (points[:, 1:2] - edge_start[:, 1]) -
+                 (edge_end[:, 1] - edge_start[:, 1]) * (points[:, 0:1] - edge_start[:, 0]))
+        return np.all(cross >= 0, axis=1) | np.all(cross <= 0, axis=1)
+
+    def transform_points(self, points):
+        """Project many pixel positions at once; points outside the court become NaN"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        transformed = np.full(points.shape, np.nan, dtype=np.float32)
+        if len(points) == 0:
+            return transformed
+
+        valid = ~np.isnan(points).any(axis=1)
+        valid[valid] = self.points_inside_court(points[valid])
+        if np.any(valid):
+            projected = cv2.perspectiveTransform(points[valid].reshape(-1,1,2).astype(np.float32),
+                                                 self.persepctive_trasnformer)
+            transformed[valid] = projected.reshape(-1,2)
+        return transformed
+
     def transform_point(self,point):
-        p = (int(point[0]),int(point[1]))
-        is_inside = cv2.pointPolygonTest(self.pixel_vertices,p,False) >= 0 
-        if not is_inside:
+        tranform_point = self.transform_points(point)
+        if np.isnan(tranform_point[0,0]):
             return None
-
-        reshaped_point = point.reshape(-1,1,2).astype(np.float32)
-        tranform_point = cv2.perspectiveTransform(reshaped_point,self.persepctive_trasnformer)
-        return tranform_point.reshape(-1,2)
+        return tranform_point
 
     def add_transformed_position_to_tracks(self,tracks):
+        # Gather every position of the video, project them in one call, then scatter back
+        track_refs = []
+        positions = []
         for object, object_tracks in tracks.items():
             for frame_num, track in enumerate(object_tracks):
                 for track_id, track_info in track.items():
-                    position = track_info['position_adjusted']
-                    position = np.array(position)
-                    position_trasnformed = self.transform_point(position)
-                    if position_trasnformed is not None:
-                        position_trasnformed = position_trasnformed.squeeze().tolist()
-                    tracks[object][frame_num][track_id]['position_transformed'] = position_trasnformed
\ No newline at end of file
+                    track_refs.append(track_info)
+                    positions.append(track_info['position_adjusted'])
+
+        positions_transformed = self.transform_points(positions)
+        for track_info, position_trasnformed in zip(track_refs, positions_transformed):
+            if np.isnan(position_trasnformed[0]):
+                track_info['position_transformed'] = None
+            else:
+                track_info['position_transformed'] = position_trasnformed.tolist()
+
+    def add_transformed_position_to_table(self, table):
+        table.position_transformed[:] = self.transform_points(table.position_adjusted)
\ No newline at end of file